@@ -1,10 +1,47 @@
 # created by: Dennis Kwong
 # cost: 2.00 cat food
 
+import bisect
+import contextlib
+import heapq
+import itertools
 import json
 import logging
+import os
+import pickle
 import re
+import threading
 from cat import Cat
+from cat import FORMS
+from cat import Family
+from cat import compile_search
+from collections import OrderedDict
+from expression import parse_expression
+from query import Query
+from text_index import TextIndex
+from trigram_index import TrigramIndex
+
+# bump whenever Cat or the indexes change shape, older snapshots are ignored
+SNAPSHOT_VERSION = 7
+# distinct (field, search) pairs whose matching values are memoized
+MATCH_CACHE_SIZE = 1024
+# normalized searches whose results are kept by Bc.search
+RESULT_CACHE_SIZE = 256
+# attributes with a bitset inverted index, value -> bits of cat positions
+INDEXED_FIELDS = ("ability", "effect", "target", "rarity", "form")
+# cost facets count cats per bucket of this many cat food, labelled like a cost range search, e.g. 1000..1999
+COST_BUCKET_SIZE = 1000
+# orders supported by Bc.page, cost sorts by a cat's lowest cost
+SORT_KEYS = {
+    "cost": lambda cat: cat.cost if isinstance(cat.cost, int) else min(cat.cost),
+    "name": lambda cat: cat.name.lower(),
+    "rarity_index": lambda cat: cat.rarity_index,
+    "rarity_pct": lambda cat: cat.rarity_pct
+}
+# keyword arguments of Bc.search besides the searches of Query.FIELDS
+SEARCH_OPTIONS = ("family", "limit", "offset", "sort")
+# Bc.stats category -> indexed field it counts
+STATS_FIELDS = {"abilities": "ability", "effects": "effect", "rarities": "rarity", "targets": "target"}
 
 
 class InputError(Exception):
@@ -15,16 +52,78 @@ class InputError(Exception):
 
 
 class Bc:
-    def __init__(self, input_file):
+    def __init__(self, input_file, snapshot_file=None, profiler=None):
         """
-        open input_file and load into self.cats.
-        :param str input_file: input file to process
+        open input_file and load into self.cats. a fresh snapshot_file is loaded instead when given, a
+        missing or stale one is written again after loading input_file.
+        :param str input_file: input file to process, .jsonl files are read one cat per line
+        :param str snapshot_file: optional snapshot written by save_snapshot
+        :param Profiler profiler: optional profiler that times loading and searches
         """
         self.logger = logging.getLogger("bc")
+        self.profiler = profiler
+        self.json_cats = None
+        self.cats = list()
+        self.families = list()
+        self.index = dict()
+        self.positions = dict()
+        self.cardinality = dict()
+        self.cost_values = list()
+        self.cost_positions = list()
+        self.cost_buckets = dict()
+        self.text_index = TextIndex([])
+        self.name_index = TrigramIndex(dict())
+        self._matches = dict()
+        # bumped whenever cats are (re)loaded, cached results of older versions are stale
+        self.version = 0
+        self._results = OrderedDict()
+        # optional executor with a run(query) method, e.g. parallel.ParallelExecutor, used by search
+        self.executor = None
+        # (version, ColumnarTable) built on first use
+        self._columnar = None
+        self._hits = 0
+        self._misses = 0
+        # guards the result cache and its counters, e.g. for the worker threads of server.py
+        self._lock = threading.Lock()
+        if snapshot_file:
+            with self.stage("load_snapshot"):
+                if self.load_snapshot(snapshot_file, input_file):
+                    return
+
         with open(input_file, "r") as fh:
-            self.json_cats = json.load(fh)
-            self.cats = list()
-            self.load_cats()
+            if input_file.endswith(".jsonl"):
+                # json lines, one cat per line, read lazily
+                with self.stage("load_cats"):
+                    self.load_cats(json.loads(line) for line in fh if line.strip())
+            else:
+                with self.stage("json_load"):
+                    self.json_cats = json.load(fh)
+                with self.stage("load_cats"):
+                    self.load_cats()
+                # the Cats hold everything they need, do not keep the raw json alive
+                self.json_cats = None
+
+        if snapshot_file:
+            with self.stage("save_snapshot"):
+                try:
+                    self.save_snapshot(snapshot_file, input_file)
+                except OSError as e:
+                    self.logger.warning(f"Could not save snapshot {snapshot_file}: {e}")
+
+    def cache_info(self):
+        """
+        counters of the search result cache
+        :return: hits, misses, size, maxsize and catalog version
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "size": len(self._results),
+                "maxsize": RESULT_CACHE_SIZE,
+                "version": self.version
+            }
 
     def find_ability(self, ability, cats=None):
         """
@@ -34,13 +133,8 @@ class Bc:
         :return: list of Cats
         :rtype: list
         """
-        result = list()
-        if cats is None:
-            cats = self.cats
-        for cat in cats:
-            if cat.get_ability(ability):
-                result.append(cat)
-        return result
+        bits = self._find_bits("ability", ability) & self._to_bits(cats)
+        return self._to_cats(bits)
 
     def find_ability_effect(self, ability_effect, cats=None):
         """
@@ -50,12 +144,99 @@ class Bc:
         :return: list of Cats
         :rtype: list
         """
-        result = set()
-        for cat in self.find_ability(ability_effect, cats):
-            result.add(cat)
-        for cat in self.find_effect(ability_effect, cats):
-            result.add(cat)
-        return list(result)
+        bits = self._find_bits("ability", ability_effect) | self._find_bits("effect", ability_effect)
+        return self._to_cats(bits & self._to_bits(cats))
+
+    def find_bits(self, field, search, bits=None):
+        """
+        find the cats matching one find_* search as a bitset, used to combine searches without
+        building a list per search. name and description only test the cats in bits.
+        :param str field: ability, ability_effect, cost, description, effect, form, name, rarity or target
+        :param str search: search string
+        :param int bits: optional bitset of candidate cat positions, None for all cats
+        :return: bitset of matching cat positions
+        :rtype: int
+        """
+        if bits is None:
+            bits = (1 << len(self.cats)) - 1
+        if field == "ability_effect":
+            return (self._find_bits("ability", search) | self._find_bits("effect", search)) & bits
+        if field == "cost":
+            return self._find_cost(*parse_cost(search)) & bits
+        if field in INDEXED_FIELDS:
+            return self._find_bits(field, search) & bits
+        if field in ("description", "name"):
+            return self._to_bits(getattr(self, f"find_{field}")(search, self._to_cats(bits)))
+        raise InputError(f"Invalid field: {field}")
+
+    def find_expression(self, expression, cats=None):
+        """
+        find cats matching a boolean expression, e.g.
+        (ability~wave OR effect~freeze) AND rarity=uber AND NOT target=traitless AND cost<=3000
+        the expression is parsed once and evaluated over the bitset indexes, see Expression.
+        :param str expression: expression to evaluate
+        :param list cats: optional list of Cats to search
+        :return: list of Cats
+        :rtype: list
+        """
+        try:
+            parsed = parse_expression(expression)
+        except ValueError as e:
+            raise InputError(str(e))
+        return self._to_cats(parsed.evaluate(self, self._to_bits(cats)))
+
+    def expand_families(self, cats):
+        """
+        every form of the families of cats
+        :param list cats: list of Cats
+        :return: list of Cats in catalog order
+        :rtype: list
+        """
+        positions = [self.positions[form] for family in self.group_families(cats) for form in family.forms]
+        return self._to_cats(_bits_from_positions(positions, len(self.cats)))
+
+    def group_families(self, cats=None):
+        """
+        the distinct families of cats, a family is listed once however many of its forms are in cats
+        :param list cats: optional list of Cats, None for all cats
+        :return: list of Families in the order of their first form in cats
+        :rtype: list
+        """
+        if cats is None:
+            return list(self.families)
+        return list(dict.fromkeys(cat.family for cat in cats))
+
+    def find_fuzzy(self, name, cats=None, limit=10, max_distance=None):
+        """
+        find cats by name or alias, allowing typos. a cat matches if one of its names is within
+        max_distance edits of name, see TrigramIndex.search.
+        :param str name: name or alias of cat, not a regex
+        :param list cats: optional list of Cats to search
+        :param int limit: maximum number of Cats
+        :param int max_distance: maximum edit distance, see TrigramIndex.search for the default
+        :return: list of Cats, closest first
+        :rtype: list
+        """
+        bits = self._to_bits(cats)
+        keep = None if cats is None else \
+            (lambda match: any(bits >> position & 1 for position in self.name_index.positions[match]))
+
+        # the forms of a family share their names, ask for more names until limit cats are found
+        names = limit
+        while True:
+            result = list()
+            seen = set()
+            matches = self.name_index.search(name, names, max_distance, keep)
+            for match, distance, similarity in matches:
+                for position in self.name_index.positions[match]:
+                    if bits >> position & 1 and position not in seen:
+                        seen.add(position)
+                        result.append(self.cats[position])
+                        if len(result) == limit:
+                            return result
+            if len(matches) < names:
+                return result
+            names *= len(FORMS)
 
     def find_name(self, name, cats=None):
         """
@@ -68,78 +249,71 @@ class Bc:
         result = list()
         if cats is None:
             cats = self.cats
+        pattern = compile_search(name)
         for cat in cats:
-            if re.search(name, cat.name, re.IGNORECASE):
+            if pattern.search(cat.name):
                 result.append(cat)
+        self.count("regex_match", len(cats))
         return result
 
     def find_cost(self, cost, cats=None):
         """
-        find cost of cat, also supports operators <, <=, >=, >
-        :param int or str cost: examples supported: 75, ">= 75", "< 1000"
+        find cost of cat, also supports operators <, <=, >=, > and inclusive ranges a..b
+        :param int or str cost: examples supported: 75, ">= 75", "< 1000", "75..150"
         :param list cats: optional list of Cats to search
         :return: list of Cats
         :rtype: list
         """
-        operator = "=="
-        cost = cost.strip()
-        if cats is None:
-            cats = self.cats
-
-        matches = re.match(r"(=|==|<|<=|>=|>) *(\d+)$", cost)
-        if matches:
-            operator = matches.group(1)
-            cost = matches.group(2)
-
-            if operator == "=":
-                operator = "=="
-        else:
-            matches = re.match(r"^\d+$", cost)
-            if matches:
-                cost = matches.group(0)
-            else:
-                raise InputError(f"Invalid cost: {cost}")
+        low, high = parse_cost(cost)
+        return self._to_cats(self._find_cost(low, high) & self._to_bits(cats))
 
-        result = self._find_cost(int(cost), operator, cats)
-        return result
+    def _find_cost(self, low, high):
+        """
+        helper method that finds the cats with a cost in an inclusive cost range
+        :param int low: lowest cost, None for no lower bound
+        :param int high: highest cost, None for no upper bound
+        :return: bitset of cats with at least one cost in the range
+        :rtype: int
+        """
+        start, end = self._cost_slice(low, high)
+        return _bits_from_positions(self.cost_positions[start:end], len(self.cats))
 
-    @staticmethod
-    def _find_cost(cost, operator, cats):
+    def _cost_slice(self, low, high):
         """
-        helper method that handles cost search with supported operators
-        :param int cost: cost of Cat
-        :param str operator: integer equality / inequality operators
-        :param list cats: list of Cats to search
-        :return: list of Cats matching the search criteria
-        :rtype: list
+        helper method that binary searches the sorted cost index for an inclusive cost range
+        :param int low: lowest cost, None for no lower bound
+        :param int high: highest cost, None for no upper bound
+        :return: (start, end) slice of the cost index
+        :rtype: tuple
         """
-        if operator in ("<", "<=", "==", ">=", ">"):
-            result = list()
-            for cat in cats:
-                cat_costs = cat.cost
-                if isinstance(cat_costs, int):
-                    cat_costs = [cat_costs]
-                for cat_cost in cat_costs:
-                    if eval(f"{cat_cost} {operator} {cost}"):
-                        result.append(cat)
-            return result
-        else:
-            print(f"Operator {operator} is not supported.")
+        start = 0 if low is None else bisect.bisect_left(self.cost_values, low)
+        end = len(self.cost_values) if high is None else bisect.bisect_right(self.cost_values, high)
+        return start, end
 
     def find_description(self, description, cats=None):
         """
-        find cat with description
+        find cat with description. plain text is looked up in the full-text index first so only
+        candidate descriptions are searched with the regex.
         :param str description: description to search for, can be regex
         :param list cats: optional list of Cats to search
         :return: list of Cats
         :rtype: list
         """
+        candidates = None
+        if _is_plain(description):
+            candidates = self.text_index.candidates(description)
+        if candidates is None:
+            if cats is None:
+                cats = self.cats
+        else:
+            bits = _bits_from_positions(candidates, len(self.cats)) & self._to_bits(cats)
+            cats = self._to_cats(bits)
+
         result = list()
-        if cats is None:
-            cats = self.cats
         for cat in cats:
             if cat.get_description(description):
                 result.append(cat)
+        self.count("regex_match", len(cats))
         return result
 
     def find_effect(self, effect, cats=None):
@@ -150,13 +324,19 @@ class Bc:
         :return: list of Cats
         :rtype: list
         """
-        result = list()
-        if cats is None:
-            cats = self.cats
-        for cat in cats:
-            if cat.get_effect(effect):
-                result.append(cat)
-        return result
+        bits = self._find_bits("effect", effect) & self._to_bits(cats)
+        return self._to_cats(bits)
+
+    def find_text(self, text, cats=None):
+        """
+        ranked full-text search of descriptions, every word must match
+        :param str text: words to search for, a word ending in * matches any word with that prefix
+        :param list cats: optional list of Cats to search
+        :return: list of Cats, best match first
+        :rtype: list
+        """
+        bits = self._to_bits(cats)
+        return [self.cats[position] for position, score in self.text_index.search(text) if bits >> position & 1]
 
     def find_form(self, form, cats=None):
         """
@@ -166,13 +346,8 @@ class Bc:
         :return: list of Cats
         :rtype: list
         """
-        result = list()
-        if cats is None:
-            cats = self.cats
-        for cat in cats:
-            if cat.get_form(form):
-                result.append(cat)
-        return result
+        bits = self._find_bits("form", form) & self._to_bits(cats)
+        return self._to_cats(bits)
 
     def find_rarity(self, rarity, cats=None):
         """
@@ -182,13 +357,8 @@ class Bc:
         :return: list of Cats that match rarity
         :rtype: list
         """
-        result = list()
-        if cats is None:
-            cats = self.cats
-        for cat in cats:
-            if re.search(rarity, cat.rarity, re.IGNORECASE):
-                result.append(cat)
-        return result
+        bits = self._find_bits("rarity", rarity) & self._to_bits(cats)
+        return self._to_cats(bits)
 
     def find_target(self, target, cats=None):
         """
@@ -198,13 +368,8 @@ class Bc:
         :return: list of Cats that match target
         :rtype: list
         """
-        result = list()
-        if cats is None:
-            cats = self.cats
-        for cat in cats:
-            if cat.get_target(target):
-                result.append(cat)
-        return result
+        bits = self._find_bits("target", target) & self._to_bits(cats)
+        return self._to_cats(bits)
 
     def list_cats(self):
         """
@@ -225,32 +390,509 @@ class Bc:
             rarity_pct = f"{cat.rarity_pct:.2}"
             print(f"{name} ({rarity_map[rarity]});{rarity_pct.lstrip('0').rstrip('.0')}")
 
-    def load_cats(self):
+    def load_cats(self, records=None):
         """
         read cats from bc.json, create Cat objects and load them into self.cats.
+        :param iterable records: optional cats in dictionary form, defaults to self.json_cats
+        :return: None
+        """
+        if records is None:
+            records = self.json_cats["cats"]
+        # equal tuples are shared by every cat, e.g. ("Single Attack",)
+        shared = dict()
+        # the forms of a family share one Family holding the fields they have in common
+        # rarity_index is the position of the family in its rarity, names could be ambiguous
+        families = {(family.rarity, family.rarity_index): family for family in self.families}
+        for cat in records:
+            key = (cat["rarity"], cat["rarity_index"])
+            if key not in families:
+                families[key] = Family(cat)
+                self.families.append(families[key])
+            cat = Cat(cat, families[key])
+            for field in ("ability", "effect", "target"):
+                value = getattr(cat, field)
+                setattr(cat, field, shared.setdefault(value, value))
+            self.cats.append(cat)
+        with self.stage("build_index"):
+            self.build_index()
+
+    def load_snapshot(self, snapshot_file, input_file):
+        """
+        load cats and indexes from a snapshot if it is the current version and was built from
+        input_file as it is now.
+        :param str snapshot_file: snapshot written by save_snapshot
+        :param str input_file: json file the snapshot must have been built from
+        :return: True if the snapshot was loaded
+        :rtype: bool
+        """
+        try:
+            with open(snapshot_file, "rb") as fh:
+                snapshot = pickle.load(fh)
+        except FileNotFoundError:
+            return False
+        except (pickle.UnpicklingError, EOFError, AttributeError, TypeError) as e:
+            self.logger.warning(f"Ignoring unreadable snapshot {snapshot_file}: {e}")
+            return False
+
+        if snapshot.get("version") != SNAPSHOT_VERSION or snapshot.get("source") != file_signature(input_file):
+            self.logger.info(f"Snapshot {snapshot_file} is stale, loading {input_file}")
+            return False
+
+        self.cats = snapshot["cats"]
+        self.families = snapshot["families"]
+        self.index = snapshot["index"]
+        self.cardinality = snapshot["cardinality"]
+        self.cost_values = snapshot["cost_values"]
+        self.cost_positions = snapshot["cost_positions"]
+        self.cost_buckets = snapshot["cost_buckets"]
+        self.text_index = snapshot["text_index"]
+        self.name_index = snapshot["name_index"]
+        self.positions = {cat: position for position, cat in enumerate(self.cats)}
+        self._matches = dict()
+        self.version += 1
+        self.logger.info(f"Loaded snapshot {snapshot_file}")
+        return True
+
+    def build_index(self):
+        """
+        build the inverted index of INDEXED_FIELDS, each distinct value maps to an integer
+        bitset where bit n is set if self.cats[n] has that value. also build the cost index,
+        every (cost, position) pair sorted by cost, the full-text index of descriptions and the
+        trigram index of names and aliases. cost buckets get a bitset too, for facets, and so does
+        every family, the bits of all its forms.
+        :return: None
+        """
+        positions = {field: dict() for field in INDEXED_FIELDS}
+        self.positions = dict()
+        for position, cat in enumerate(self.cats):
+            self.positions[cat] = position
+            for field in INDEXED_FIELDS:
+                values = getattr(cat, field)
+                if isinstance(values, str):
+                    values = [values]
+                for value in values:
+                    value_positions = positions[field].setdefault(value, list())
+                    if not value_positions or value_positions[-1] != position:
+                        value_positions.append(position)
+
+        costs = list()
+        for position, cat in enumerate(self.cats):
+            cat_costs = cat.cost
+            if isinstance(cat_costs, int):
+                cat_costs = [cat_costs]
+            for cat_cost in cat_costs:
+                costs.append((cat_cost, position))
+        costs.sort()
+        self.cost_values = [cat_cost for cat_cost, position in costs]
+        self.cost_positions = [position for cat_cost, position in costs]
+        buckets = dict()
+        for cat_cost, position in costs:
+            buckets.setdefault(cat_cost // COST_BUCKET_SIZE, set()).add(position)
+        self.cost_buckets = {bucket: _bits_from_positions(sorted(bucket_positions), len(self.cats))
+                             for bucket, bucket_positions in sorted(buckets.items())}
+
+        self.text_index = TextIndex([cat.description for cat in self.cats])
+        names = dict()
+        for position, cat in enumerate(self.cats):
+            for name in cat.family.names:
+                names.setdefault(name, list()).append(position)
+        self.name_index = TrigramIndex(names)
+        self.index = dict()
+        self.cardinality = dict()
+        self._matches = dict()
+        self.version += 1
+        for field in INDEXED_FIELDS:
+            self.index[field] = dict()
+            self.cardinality[field] = dict()
+            for value, value_positions in positions[field].items():
+                self.index[field][value] = _bits_from_positions(value_positions, len(self.cats))
+                self.cardinality[field][value] = len(value_positions)
+
+    def columnar(self):
+        """
+        numpy columns of the numeric fields, built on first use and again after cats are reloaded
+        :return: columnar table of self.cats
+        :rtype: ColumnarTable
+        """
+        if self._columnar is None or self._columnar[0] != self.version:
+            # numpy takes longer to import than a snapshot takes to load, only columnar queries import it
+            from columnar import ColumnarTable
+            try:
+                self._columnar = (self.version, ColumnarTable(self.cats))
+            except ImportError as e:
+                raise InputError(f"Columnar queries need numpy: {e}")
+        return self._columnar[1]
+
+    def cost_stats(self, cats=None, bins=None):
+        """
+        count, min, max, mean and histogram of costs per rarity, computed on the numpy columns
+        :param list cats: optional list of Cats, None for all cats
+        :param list bins: optional histogram bin edges, defaults to COST_BUCKET_SIZE wide bins from 0
+        :return: rarity -> stats, see ColumnarTable.cost_stats
+        :rtype: dict
+        """
+        table = self.columnar()
+        if bins is None:
+            highest = max(self.cost_values, default=0)
+            bins = list(range(0, highest + COST_BUCKET_SIZE + 1, COST_BUCKET_SIZE))
+        mask = None if cats is None else table.rows(self.positions[cat] for cat in cats)
+        return table.cost_stats(mask, bins)
+
+    def count(self, name, count=1):
+        """
+        add to a profiler counter, does nothing without a profiler
+        :param str name: counter name
+        :param int count: amount to add
+        :return: None
+        """
+        if self.profiler:
+            self.profiler.count(name, count)
+
+    def facets(self, cats=None, fields=INDEXED_FIELDS + ("cost",)):
+        """
+        count the cats of a result set per value of each field, from the bitset indexes. e.g. facets of
+        the Uber cats that target Red give how many of them have each ability.
+        :param list cats: optional list of Cats, None for all cats
+        :param tuple fields: INDEXED_FIELDS and/or cost
+        :return: field -> value -> count of cats with that value, values without cats are left out.
+            cost values are bucket ranges, e.g. "1000..1999".
+        :rtype: dict
+        """
+        bits = self._to_bits(cats)
+        facets = dict()
+        for field in fields:
+            if field == "cost":
+                values = {f"{bucket * COST_BUCKET_SIZE}..{(bucket + 1) * COST_BUCKET_SIZE - 1}": value_bits
+                          for bucket, value_bits in self.cost_buckets.items()}
+            elif field in INDEXED_FIELDS:
+                values = self.index[field]
+            else:
+                raise InputError(f"No facets for {field}, expected some of {', '.join(INDEXED_FIELDS)}, cost")
+            counts = dict()
+            for value, value_bits in values.items():
+                count = (value_bits & bits).bit_count()
+                if count:
+                    counts[value] = count
+            facets[field] = counts
+        return facets
+
+    def estimate(self, field, search):
+        """
+        estimate how many cats match a search without building the result. indexed fields add
+        up the cardinalities of the matching values, cost counts the matching cost index entries,
+        other fields can only be answered by a scan so every cat is counted.
+        :param str field: name of find_* search, e.g. rarity, cost, ability_effect
+        :param str search: search string
+        :return: estimated number of matching cats
+        :rtype: int
+        """
+        if field == "ability_effect":
+            return min(len(self.cats), self.estimate("ability", search) + self.estimate("effect", search))
+        if field == "cost":
+            low, high = parse_cost(search)
+            start, end = self._cost_slice(low, high)
+            return max(0, end - start)
+        if field in INDEXED_FIELDS:
+            return sum(self.cardinality[field][value] for value in self.match_values(field, search))
+        return len(self.cats)
+
+    def match_values(self, field, search):
+        """
+        return the distinct values of an indexed field that match search. the regex is compiled
+        once and tested against the vocabulary of the field, the result is memoized.
+        :param str field: one of INDEXED_FIELDS
+        :param str search: regex search string
+        :return: matching values
+        :rtype: frozenset
+        """
+        key = (field, search)
+        values = self._matches.get(key)
+        if values is None:
+            pattern = compile_search(search)
+            values = frozenset(value for value in self.index[field] if pattern.search(value))
+            self.count("regex_match", len(self.index[field]))
+            if len(self._matches) >= MATCH_CACHE_SIZE:
+                self._matches.clear()
+            self._matches[key] = values
+        return values
+
+    def _find_bits(self, field, search):
+        """
+        helper method that ORs the bitsets of every indexed value matching search
+        :param str field: one of INDEXED_FIELDS
+        :param str search: regex search string
+        :return: bitset of matching cat positions
+        :rtype: int
+        """
+        bits = 0
+        for value in self.match_values(field, search):
+            bits |= self.index[field][value]
+        return bits
+
+    def _to_bits(self, cats):
+        """
+        helper method that converts a list of Cats to a bitset of cat positions
+        :param list cats: list of Cats, None for all cats
+        :return: bitset of cat positions
+        :rtype: int
+        """
+        if cats is None:
+            return (1 << len(self.cats)) - 1
+        return _bits_from_positions([self.positions[cat] for cat in cats], len(self.cats))
+
+    def _to_cats(self, bits):
+        """
+        helper method that converts a bitset of cat positions to a list of Cats in catalog order
+        :param int bits: bitset of cat positions
+        :return: list of Cats
+        :rtype: list
+        """
+        return [self.cats[position] for position in _positions_from_bits(bits)]
+
+    def save_snapshot(self, snapshot_file, input_file):
+        """
+        write cats and indexes to a binary snapshot that loads in one call.
+        :param str snapshot_file: snapshot filename
+        :param str input_file: json file the cats were loaded from
         :return: None
         """
-        for cat in self.json_cats["cats"]:
-            self.cats.append(Cat(cat))
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "source": file_signature(input_file),
+            "cats": self.cats,
+            "families": self.families,
+            "index": self.index,
+            "cardinality": self.cardinality,
+            "cost_values": self.cost_values,
+            "cost_positions": self.cost_positions,
+            "cost_buckets": self.cost_buckets,
+            "text_index": self.text_index,
+            "name_index": self.name_index
+        }
+        tmp_file = f"{snapshot_file}.tmp"
+        with open(tmp_file, "wb") as fh:
+            pickle.dump(snapshot, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, snapshot_file)
+        self.logger.info(f"Saved snapshot {snapshot_file}")
+
+    def page(self, cats=None, sort=None, limit=None, offset=0):
+        """
+        order and page cats. only the first offset + limit cats are selected, a cost sort walks the
+        sorted cost index and stops as soon as the page is full, other sorts keep a heap of the page.
+        :param list cats: optional list of Cats, None for all cats
+        :param str sort: optional key of SORT_KEYS, None keeps catalog order. ties keep catalog order.
+        :param int limit: optional maximum number of cats
+        :param int offset: number of cats to skip
+        :return: list of Cats
+        :rtype: list
+        """
+        if sort and sort not in SORT_KEYS:
+            raise InputError(f"Invalid sort: {sort}, expected one of {', '.join(SORT_KEYS)}")
+        try:
+            offset = int(offset or 0)
+            limit = None if limit in (None, "") else int(limit)
+        except ValueError:
+            raise InputError(f"Invalid limit or offset: {limit}, {offset}")
+        if offset < 0 or (limit is not None and limit < 0):
+            raise InputError(f"Invalid limit or offset: {limit}, {offset}")
+        if cats is None:
+            cats = self.cats
+        end = None if limit is None else offset + limit
+
+        if not sort:
+            selected = cats
+        elif sort == "cost" and end is not None:
+            # each cat's lowest cost comes first in the cost index, so its order matches SORT_KEYS["cost"]
+            selected = self._by_cost({self.positions[cat] for cat in cats})
+        elif end is not None:
+            selected = heapq.nsmallest(end, cats, key=SORT_KEYS[sort])
+        else:
+            selected = sorted(cats, key=SORT_KEYS[sort])
+        return list(itertools.islice(selected, offset, end))
+
+    def search(self, sort=None, limit=None, offset=0, family=False, **kwargs):
+        """
+        run a Query, results are cached by normalized search in a bounded LRU cache. the cached
+        results are ordered and paged by page, so every page of a search shares one cache entry.
+        :param str sort: optional key of SORT_KEYS
+        :param int limit: optional maximum number of cats
+        :param int offset: number of cats to skip
+        :param bool family: family scoped, find every form of the families where each search matches any form,
+            strings such as "true" and "false" are parsed with parse_flag
+        :param kwargs: search strings by field, see Query.FIELDS
+        :return: list of Cats, None if there are no searches and no sort, limit or offset
+        :rtype: list
+        """
+        query = Query(parse_flag(family), **kwargs)
+        key = (query.family, self._query_key(query.predicates))
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] == self.version:
+                self._hits += 1
+                self._results.move_to_end(key)
+            else:
+                self._misses += 1
+                entry = None
+        if entry is not None:
+            cats = entry[1]
+        else:
+            # run without the lock, concurrent searches only wait for each other's cache updates
+            version = self.version
+            cats = self.executor.run(query) if self.executor else query.run(self)
+            cats = None if cats is None else tuple(cats)
+            with self._lock:
+                self._results[key] = (version, cats)
+                self._results.move_to_end(key)
+                while len(self._results) > RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+
+        if sort or limit is not None or offset:
+            # without searches every cat is ordered and paged
+            return self.page(cats, sort, limit, offset)
+        return None if cats is None else list(cats)
+
+    def _by_cost(self, positions):
+        """
+        helper generator of the cats at positions, cheapest first, walking the cost index
+        :param set positions: cat positions
+        :return: Cats in cost order
+        :rtype: generator
+        """
+        seen = set()
+        for position in self.cost_positions:
+            if position in positions and position not in seen:
+                seen.add(position)
+                yield self.cats[position]
+
+    @staticmethod
+    def _query_key(predicates):
+        """
+        helper method that normalizes searches so equivalent ones share a cache entry. costs become
+        their inclusive range and plain text searches are case folded. regex searches are kept as is,
+        case folding could change the meaning of escapes like \\S.
+        :param dict predicates: search strings by field
+        :return: hashable key
+        :rtype: tuple
+        """
+        key = list()
+        for field, search in predicates.items():
+            if field == "cost":
+                search = parse_cost(search)
+            elif _is_plain(search):
+                search = search.lower()
+            key.append((field, search))
+        return tuple(sorted(key))
+
+    def stage(self, name):
+        """
+        time a stage with the profiler
+        :param str name: stage name
+        :return: context manager, does nothing without a profiler
+        """
+        if self.profiler:
+            return self.profiler.stage(name)
+        return contextlib.nullcontext()
 
     def stats(self):
         """
-        Build stats of abilities, effects, rarities and targets.
+        Stats of abilities, effects, rarities and targets, the cat counts computed with the index at load.
         :return: stats dictionary
         :rtype: dict
         """
-        stats = {"abilities": {}, "effects": {}, "rarities": {}, "targets": {}}
-        for cat in self.cats:
-            for ability in cat.ability:
-                stats["abilities"][ability] = stats["abilities"].get(ability, 0) + 1
+        return {category: dict(self.cardinality[field]) for category, field in STATS_FIELDS.items()}
 
-            for effect in cat.effect:
-                stats["effects"][effect] = stats["effects"].get(effect, 0) + 1
 
-            rarity = cat.rarity
-            stats["rarities"][rarity] = stats["rarities"].get(rarity, 0) + 1
+def parse_cost(cost):
+    """
+    parse a cost search into an inclusive range
+    :param int or str cost: examples supported: 75, ">= 75", "< 1000", "75..150"
+    :return: (low, high) where None means unbounded
+    :rtype: tuple
+    """
+    cost = str(cost).strip()
+    matches = re.match(r"(=|==|<|<=|>=|>)? *(\d+)$", cost)
+    if matches:
+        operator = matches.group(1) or "=="
+        cost = int(matches.group(2))
+        return {
+            "<": (None, cost - 1),
+            "<=": (None, cost),
+            "=": (cost, cost),
+            "==": (cost, cost),
+            ">=": (cost, None),
+            ">": (cost + 1, None)
+        }[operator]
+
+    matches = re.match(r"(\d+) *\.\. *(\d+)$", cost)
+    if matches:
+        return int(matches.group(1)), int(matches.group(2))
+    raise InputError(f"Invalid cost: {cost}")
+
+
+def parse_flag(flag):
+    """
+    parse an on/off option, e.g. from a query string
+    :param bool or str flag: examples supported: True, False, None, "true", "false", "1", "0", "yes", "no", ""
+    :return: the option as a bool
+    :rtype: bool
+    """
+    if flag is None or isinstance(flag, bool):
+        return bool(flag)
+    value = str(flag).strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("", "0", "false", "no", "off"):
+        return False
+    raise InputError(f"Invalid flag: {flag}")
+
+
+def file_signature(filename):
+    """
+    identify the current contents of a file without reading it
+    :param str filename: file to identify
+    :return: (size, mtime in ns)
+    :rtype: tuple
+    """
+    stat = os.stat(filename)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _is_plain(search):
+    """
+    tell whether a search is plain text, so it matches itself literally. whitespace is literal
+    even though re.escape escapes it.
+    :param str search: search string
+    :return: True if search has no regex syntax
+    :rtype: bool
+    """
+    text = "".join(search.split())
+    return re.escape(text) == text
+
+
+def _bits_from_positions(positions, size):
+    """
+    build an integer bitset with the given bit positions set
+    :param list positions: bit positions to set
+    :param int size: number of bits in the set
+    :return: bitset
+    :rtype: int
+    """
+    bitmap = bytearray((size + 7) // 8)
+    for position in positions:
+        bitmap[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bitmap, "little")
 
-            for target in cat.target:
-                stats["targets"][target] = stats["targets"].get(target, 0) + 1
 
-        return stats
+def _positions_from_bits(bits):
+    """
+    generate the positions of the set bits, lowest first
+    :param int bits: bitset
+    :return: generator of bit positions
+    :rtype: generator
+    """
+    for byte_index, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+        if byte:
+            base = byte_index << 3
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield base + bit
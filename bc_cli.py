@@ -0,0 +1,12 @@
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+# the bc cli script has no .py extension, import bc_cli to use it as a module. the script runs
+# once per process into this module, so its log handler is only added once.
+
+from importlib.machinery import SourceFileLoader
+import os
+import sys
+
+SourceFileLoader(__name__, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bc")).exec_module(
+    sys.modules[__name__])
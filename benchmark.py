@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+from bc import Bc
+import bc_cli
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# searches timed against every catalog size, (name, find_* method, search)
+FIND_BENCHMARKS = [
+    ("find_ability", "ability", "wave"),
+    ("find_ability_effect", "ability_effect", "knockback"),
+    ("find_cost", "cost", "<=1000"),
+    ("find_cost_range", "cost", "1000..3000"),
+    ("find_description", "description", "wave attack"),
+    ("find_description_regex", "description", "wave.*attack"),
+    ("find_effect", "effect", "freeze"),
+    ("find_form", "form", "true"),
+    ("find_fuzzy", "fuzzy", "synthetic cat 42"),
+    ("find_name", "name", "cat 1"),
+    ("find_rarity", "rarity", "uber"),
+    ("find_target", "target", "red"),
+    ("find_text", "text", "wave immun*")
+]
+
+
+def synthetic_source(source, families, seed=0):
+    """
+    build a synthetic bc_source with the given number of families. every family copies the
+    abilities, effects, targets, costs, descriptions and talents of a random real family and
+    the rarities are drawn with the real proportions, so value distributions stay realistic.
+    :param dict source: real bc_source to sample from
+    :param int families: number of families to generate
+    :param int seed: random seed
+    :return: synthetic bc_source
+    :rtype: dict
+    """
+    rng = random.Random(seed)
+    real = [(rarity, cat) for rarity, cats in source["cats"].items() for cat in cats]
+    synthetic = {"cats": {rarity: list() for rarity in source["cats"]}}
+    for index in range(families):
+        rarity, cat = rng.choice(real)
+        cat = json.loads(json.dumps(cat))
+        cat["name"] = [f"{prefix}Synthetic Cat {index}" if name else ""
+                       for prefix, name in zip(("", "Evolved ", "True "), cat["name"])]
+        synthetic["cats"][rarity].append(cat)
+    return synthetic
+
+
+def timed(function, repeat=1):
+    """
+    time a function
+    :param function function: function without arguments
+    :param int repeat: number of runs
+    :return: (median seconds, result of the last run)
+    :rtype: tuple
+    """
+    times = list()
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def run_benchmarks(source, families, repeat=5, seed=0):
+    """
+    time generation, loading, every find_* search, chained queries and stats on a synthetic
+    catalog of the given size
+    :param dict source: real bc_source to sample from
+    :param int families: number of families
+    :param int repeat: runs per search, the median is reported
+    :param int seed: random seed
+    :return: benchmark name -> seconds
+    :rtype: dict
+    """
+    results = dict()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source_file = os.path.join(tmp_dir, "bc_source.json")
+        target_file = os.path.join(tmp_dir, "bc.json")
+        snapshot_file = os.path.join(tmp_dir, "bc.snapshot")
+        with open(source_file, "w") as fh:
+            json.dump(synthetic_source(source, families, seed), fh)
+
+        results["generate_bc_json"], _ = timed(lambda: bc_cli.generate_bc_json(source_file, target_file,
+                                                                                snapshot_file))
+        results["bc_init_json"], bc = timed(lambda: Bc(target_file))
+        results["bc_init_snapshot"], _ = timed(lambda: Bc(target_file, snapshot_file))
+
+    for name, field, search in FIND_BENCHMARKS:
+        results[name], _ = timed(lambda: getattr(bc, f"find_{field}")(search), repeat)
+    results["chained"], _ = timed(
+        lambda: bc.find_ability("wave", bc.find_target("red", bc.find_rarity("uber"))), repeat)
+    results["query_planned"], _ = timed(
+        lambda: bc.search(rarity="uber", target="red", ability="wave", description="attack"), 1)
+    results["stats"], _ = timed(bc.stats, repeat)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    find benchmarks that got slower than the baseline by more than threshold
+    :param dict results: size -> benchmark name -> seconds
+    :param dict baseline: same layout as results
+    :param float threshold: allowed slowdown, 0.2 is 20%
+    :return: list of (size, benchmark, baseline seconds, seconds)
+    :rtype: list
+    """
+    regressions = list()
+    for size, benchmarks in results.items():
+        for name, seconds in benchmarks.items():
+            before = baseline.get(size, {}).get(name)
+            if before and seconds > before * (1 + threshold):
+                regressions.append((size, name, before, seconds))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Battle Cats, benchmarks on synthetic catalogs.")
+    parser.add_argument("--baseline", "-b", help="Compare against this results file")
+    parser.add_argument("--output", "-o", default="bench_results.json", help="Write results to this file")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per search, the median is reported")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for synthetic catalogs")
+    parser.add_argument("--sizes", default="1000", help="Comma separated numbers of families, e.g. 1000,100000")
+    parser.add_argument("--source", default=bc_cli.SOURCE_FILE, help="Real catalog to sample from")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown against the baseline")
+    args = parser.parse_args()
+    # generation logs every rarity, keep the log readable
+    logging.getLogger("bc").setLevel(logging.WARNING)
+
+    with open(args.source) as fh:
+        bc_source = json.load(fh)
+    all_results = dict()
+    for families in [int(size) for size in args.sizes.split(",")]:
+        all_results[str(families)] = run_benchmarks(bc_source, families, args.repeat, args.seed)
+        for benchmark, seconds in all_results[str(families)].items():
+            print(f"{families:>8} {benchmark:<24} {seconds * 1000:10.3f} ms")
+
+    with open(args.output, "w") as fh:
+        json.dump(all_results, fh, indent=4, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(all_results, json.load(fh), args.threshold)
+        for families, benchmark, before, seconds in regressions:
+            print(f"Regression: {benchmark} on {families} families took {seconds * 1000:.3f} ms, "
+                  f"baseline {before * 1000:.3f} ms")
+        exit(1 if regressions else 0)
@@ -1,30 +1,175 @@
 # created by: Dennis Kwong
 # cost: 2.00 cat food
 
+import functools
 import re
+import sys
 
 
-class Cat:
+@functools.lru_cache(maxsize=256)
+def compile_search(search):
+    """
+    compile a case-insensitive search regex once and reuse it for every value
+    :param str search: regex search string
+    :return: compiled regex
+    :rtype: re.Pattern
+    """
+    return re.compile(search, re.IGNORECASE)
+
+
+# position of each form's name in its family
+FORMS = ("Normal", "Evolved", "True")
+
+
+def family_names(cat):
+    """
+    names of every form in the family of a cat in dictionary form, the alias with the cat's own
+    name put back in the position of its form
+    :param dict cat: Cat in dictionary form
+    :return: tuple of interned names
+    :rtype: tuple
+    """
+    alias = [sys.intern(x) for x in cat["alias"]]
+    position = min(FORMS.index(cat["form"]), len(alias)) if cat["form"] in FORMS else len(alias)
+    return tuple(alias[:position] + [sys.intern(cat["name"])] + alias[position:])
+
+
+class Family:
+    __slots__ = ("forms", "names", "rarity_index", "rarity_pct", "rarity_total", "rarity")
+
     def __init__(self, cat):
         """
-        Initialize Cat
-        :param dict cat: Cat in dictionary form
+        Initialize Family, the fields every form shares are kept here once. forms are added by Cat.
+        :param dict cat: any form of the family in dictionary form
         """
-        self.cat = cat
-        self.ability = cat["ability"]
-        self.alias = cat["alias"]
-        self.cost = cat["cost"]
-        self.description = cat["description"]
-        self.effect = cat["effect"]
-        self.form = cat["form"]
-        self.name = cat["name"]
+        self.forms = list()
+        self.names = family_names(cat)
         self.rarity_index = cat["rarity_index"]
         self.rarity_pct = cat["rarity_pct"]
         self.rarity_total = cat["rarity_total"]
-        self.rarity = cat["rarity"]
+        self.rarity = sys.intern(cat["rarity"])
+
+    def add(self, cat):
+        """
+        add a form to the family and put names back in form order. the alias of one form cannot
+        tell where a form without a name was, e.g. a family without a Normal form, the forms can.
+        :param Cat cat: form of the family
+        :return: None
+        """
+        self.forms.append(cat)
+        positions = {form.name: FORMS.index(form.form) for form in self.forms if form.form in FORMS}
+        if len(positions) > 1:
+            order = {name: positions.get(name, index) for index, name in enumerate(self.names)}
+            self.names = tuple(sorted(self.names, key=order.get))
+
+    def to_dict(self):
+        """
+        return the Family in dictionary form, the shared fields and the forms as in bc.json
+        :return: Family in dictionary form
+        :rtype: dict
+        """
+        return {
+            "forms": [cat.to_dict() for cat in self.forms],
+            "names": list(self.names),
+            "rarity": self.rarity,
+            "rarity_index": self.rarity_index,
+            "rarity_pct": self.rarity_pct,
+            "rarity_total": self.rarity_total
+        }
+
+
+class Cat:
+    __slots__ = ("ability", "cost", "description", "effect", "family", "form", "name", "talents", "target")
+
+    def __init__(self, cat, family=None):
+        """
+        Initialize Cat, a view of one form of a Family. strings are interned and lists become tuples.
+        cat is not retained.
+        :param dict cat: Cat in dictionary form
+        :param Family family: optional family the form belongs to, a new one is created without it
+        """
+        self.ability = tuple(sys.intern(x) for x in cat["ability"])
+        self.cost = cat["cost"] if isinstance(cat["cost"], int) else tuple(cat["cost"])
+        self.description = cat["description"]
+        self.effect = tuple(sys.intern(x) for x in cat["effect"])
+        self.form = sys.intern(cat["form"])
+        self.name = sys.intern(cat["name"])
         if "talents" in cat and self.form == "True":
             self.talents = cat["talents"]
-        self.target = cat["target"]
+        self.target = tuple(sys.intern(x) for x in cat["target"])
+        self.family = family or Family(cat)
+        self.family.add(self)
+
+    @property
+    def alias(self):
+        """
+        names of the other forms in the family
+        :return: tuple of names
+        :rtype: tuple
+        """
+        alias = list(self.family.names)
+        alias.remove(self.name)
+        return tuple(alias)
+
+    @property
+    def rarity(self):
+        """
+        rarity of the family, e.g. Uber, shared by every form
+        :return: rarity of the family
+        :rtype: str
+        """
+        return self.family.rarity
+
+    @property
+    def rarity_index(self):
+        """
+        position of the family in its rarity, from 1, shared by every form
+        :return: rarity_index of the family
+        :rtype: int
+        """
+        return self.family.rarity_index
+
+    @property
+    def rarity_pct(self):
+        """
+        rarity_index as a fraction of rarity_total, shared by every form
+        :return: rarity_pct of the family
+        :rtype: float
+        """
+        return self.family.rarity_pct
+
+    @property
+    def rarity_total(self):
+        """
+        number of families of the rarity, shared by every form
+        :return: rarity_total of the family
+        :rtype: int
+        """
+        return self.family.rarity_total
+
+    def to_dict(self):
+        """
+        return the Cat in dictionary form, as in bc.json
+        :return: Cat in dictionary form
+        :rtype: dict
+        """
+        cat = {
+            "ability": list(self.ability),
+            "alias": list(self.alias),
+            "cost": self.cost if isinstance(self.cost, int) else list(self.cost),
+            "description": self.description,
+            "effect": list(self.effect),
+            "form": self.form,
+            "name": self.name,
+            "rarity": self.rarity,
+            "rarity_index": self.rarity_index,
+            "rarity_pct": self.rarity_pct,
+            "rarity_total": self.rarity_total,
+            "target": list(self.target)
+        }
+        if hasattr(self, "talents"):
+            cat["talents"] = self.talents
+        return cat
 
     def get_ability(self, search=None):
         """
@@ -35,9 +180,9 @@ class Cat:
         """
         if search:
             result = list()
+            pattern = compile_search(search)
             for ability in self.ability:
-                matches = re.search(search, ability, re.IGNORECASE)
-                if matches:
+                if pattern.search(ability):
                     result.append(ability)
         else:
             result = self.ability
@@ -65,8 +210,7 @@ class Cat:
         """
         result = None
         if search:
-            matches = re.search(search, self.description, re.IGNORECASE)
-            if matches:
+            if compile_search(search).search(self.description):
                 result = self.description
         else:
             result = self.description
@@ -81,9 +225,9 @@ class Cat:
         """
         if search:
             result = list()
+            pattern = compile_search(search)
             for effect in self.effect:
-                matches = re.search(search, effect, re.IGNORECASE)
-                if matches:
+                if pattern.search(effect):
                     result.append(effect)
         else:
             result = self.effect
@@ -98,8 +242,7 @@ class Cat:
         """
         result = None
         if search:
-            matches = re.search(search, self.form, re.IGNORECASE)
-            if matches:
+            if compile_search(search).search(self.form):
                 result = self.form
         else:
             result = self.form
@@ -114,9 +257,9 @@ class Cat:
         """
         if search:
             result = list()
+            pattern = compile_search(search)
             for target in self.target:
-                matches = re.search(search, target, re.IGNORECASE)
-                if matches:
+                if pattern.search(target):
                     result.append(target)
         else:
             result = self.target
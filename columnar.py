@@ -0,0 +1,142 @@
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+import operator
+
+# numpy is optional, only ColumnarTable needs it
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# numeric columns of ColumnarTable, min_cost and max_cost are the lowest and highest cost of each cat
+COLUMNS = ("max_cost", "min_cost", "rarity_index", "rarity_pct", "rarity_total")
+OPERATORS = {"<": operator.lt, "<=": operator.le, "==": operator.eq, "!=": operator.ne, ">=": operator.ge,
+             ">": operator.gt}
+
+
+class ColumnarTable:
+    def __init__(self, cats):
+        """
+        numeric fields of cats as numpy columns, one row per cat in catalog order. costs are ragged,
+        cost_values holds every cost and the costs of row n are cost_values[cost_offsets[n]:cost_offsets[n + 1]].
+        predicates return boolean masks over the rows, aggregates take an optional mask.
+        :param list cats: Cats, e.g. Bc.cats
+        """
+        if numpy is None:
+            raise ImportError("ColumnarTable needs numpy")
+        self.size = len(cats)
+        self.rarities = list(dict.fromkeys(cat.rarity for cat in cats))
+        codes = {rarity: code for code, rarity in enumerate(self.rarities)}
+        self.rarity = numpy.fromiter((codes[cat.rarity] for cat in cats), dtype=numpy.int16, count=self.size)
+        self.rarity_index = numpy.fromiter((cat.rarity_index for cat in cats), dtype=numpy.int32, count=self.size)
+        self.rarity_pct = numpy.fromiter((cat.rarity_pct for cat in cats), dtype=numpy.float64, count=self.size)
+        self.rarity_total = numpy.fromiter((cat.rarity_total for cat in cats), dtype=numpy.int32, count=self.size)
+
+        counts = numpy.fromiter((1 if isinstance(cat.cost, int) else len(cat.cost) for cat in cats),
+                                dtype=numpy.int64, count=self.size)
+        self.cost_offsets = numpy.zeros(self.size + 1, dtype=numpy.int64)
+        numpy.cumsum(counts, out=self.cost_offsets[1:])
+        self.cost_values = numpy.fromiter(
+            (cost for cat in cats for cost in ((cat.cost,) if isinstance(cat.cost, int) else cat.cost)),
+            dtype=numpy.int64, count=int(self.cost_offsets[-1]))
+        # row of every cost value
+        self.cost_rows = numpy.repeat(numpy.arange(self.size), counts)
+        self.min_cost = numpy.full(self.size, numpy.iinfo(numpy.int64).max)
+        self.max_cost = numpy.full(self.size, numpy.iinfo(numpy.int64).min)
+        numpy.minimum.at(self.min_cost, self.cost_rows, self.cost_values)
+        numpy.maximum.at(self.max_cost, self.cost_rows, self.cost_values)
+
+    def compare(self, column, op, value):
+        """
+        compare a numeric column with a value
+        :param str column: one of COLUMNS
+        :param str op: one of OPERATORS
+        :param int or float value: value to compare with
+        :return: mask of the rows where column op value
+        :rtype: numpy.ndarray
+        """
+        if column not in COLUMNS or op not in OPERATORS:
+            raise ValueError(f"Invalid comparison {column} {op} {value}")
+        return OPERATORS[op](getattr(self, column), value)
+
+    def cost_range(self, low=None, high=None):
+        """
+        rows with at least one cost in an inclusive range, like Bc.find_cost
+        :param int low: lowest cost, None for no lower bound
+        :param int high: highest cost, None for no upper bound
+        :return: mask of rows
+        :rtype: numpy.ndarray
+        """
+        hits = numpy.ones(len(self.cost_values), dtype=bool)
+        if low is not None:
+            hits &= self.cost_values >= low
+        if high is not None:
+            hits &= self.cost_values <= high
+        mask = numpy.zeros(self.size, dtype=bool)
+        mask[self.cost_rows[hits]] = True
+        return mask
+
+    def rarity_is(self, rarity):
+        """
+        rows of a rarity, ignoring case
+        :param str rarity: rarity name, e.g. uber
+        :return: mask of rows
+        :rtype: numpy.ndarray
+        """
+        codes = [code for code, name in enumerate(self.rarities) if name.lower() == rarity.lower()]
+        return numpy.isin(self.rarity, codes)
+
+    def rows(self, positions):
+        """
+        mask of the rows at positions, e.g. the positions of a search result
+        :param iterable positions: cat positions
+        :return: mask of rows
+        :rtype: numpy.ndarray
+        """
+        mask = numpy.zeros(self.size, dtype=bool)
+        mask[numpy.fromiter(positions, dtype=numpy.int64)] = True
+        return mask
+
+    def positions(self, mask):
+        """
+        cat positions of the rows in a mask, e.g. to look them up in Bc.cats
+        :param numpy.ndarray mask: mask of rows
+        :return: positions in catalog order
+        :rtype: list
+        """
+        return numpy.flatnonzero(mask).tolist()
+
+    def cost_stats(self, mask=None, bins=None):
+        """
+        count, min, max and mean of every cost and a histogram of costs, per rarity. a cat with several
+        costs contributes each of them.
+        :param numpy.ndarray mask: optional mask of rows, None for every row
+        :param list bins: optional histogram bin edges, defaults to ten equal bins over every cost
+        :return: rarity -> {"count", "min", "max", "mean", "histogram"}, histogram is a list of
+            (low edge, high edge, count). rarities without costs in the mask are left out.
+        :rtype: dict
+        """
+        if bins is None:
+            bins = numpy.histogram_bin_edges(self.cost_values, bins=10) if len(self.cost_values) else [0, 1]
+        values = self.cost_values
+        rarities = self.rarity[self.cost_rows]
+        if mask is not None:
+            selected = mask[self.cost_rows]
+            values = values[selected]
+            rarities = rarities[selected]
+        stats = dict()
+        for code, rarity in enumerate(self.rarities):
+            rarity_values = values[rarities == code]
+            if not len(rarity_values):
+                continue
+            counts, edges = numpy.histogram(rarity_values, bins=bins)
+            stats[rarity] = {
+                "count": int(len(rarity_values)),
+                "min": int(rarity_values.min()),
+                "max": int(rarity_values.max()),
+                "mean": float(rarity_values.mean()),
+                "histogram": [(float(low), float(high), int(count))
+                              for low, high, count in zip(edges[:-1], edges[1:], counts)]
+            }
+        return stats
@@ -0,0 +1,231 @@
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+import functools
+import re
+
+# a parenthesis, a field clause such as ability~wave, cost<=3000 or name="Wall Cat", or a keyword
+TOKEN = re.compile(r"""\s*(?:(?P<paren>[()])|(?P<field>\w+)\s*(?P<op>!=|!~|<=|>=|==|=|~|<|>)\s*"""
+                   r"""(?P<value>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|[^\s()]+)|(?P<word>\w+))""")
+KEYWORDS = ("AND", "OR", "NOT")
+# fields with a bitset index, answered without looking at the cats
+INDEXED_FIELDS = ("ability", "ability_effect", "cost", "effect", "form", "rarity", "target")
+# fields answered by running the regex over every candidate cat
+SCAN_FIELDS = ("name", "description")
+
+
+@functools.lru_cache(maxsize=256)
+def parse_expression(expression):
+    """
+    parse an expression once and reuse it for every search
+    :param str expression: expression, see Expression
+    :return: parsed expression
+    :rtype: Expression
+    """
+    return Expression(expression)
+
+
+class Expression:
+    def __init__(self, expression):
+        """
+        parse a boolean search expression, e.g.
+        (ability~wave OR effect~freeze) AND rarity=uber AND NOT target=traitless AND cost<=3000
+
+        field~regex matches like the find_* searches, field=value matches a whole value ignoring case,
+        != and !~ negate them. cost takes =, ==, <, <=, >= and >, = also takes ranges like 75..150.
+        NOT binds tighter than AND, AND tighter than OR. values with spaces or parentheses are quoted.
+        raises ValueError for invalid expressions, Bc.find_expression reports them as InputError.
+        :param str expression: expression to parse
+        """
+        self.expression = expression
+        self.tokens = self.tokenize(expression)
+        # fields of every clause, e.g. to tell whether the expression scans names or descriptions
+        self.fields = frozenset(token[0] for kind, token in self.tokens if kind == "clause")
+        self.position = 0
+        self.tree = self._parse_or()
+        if self.position < len(self.tokens):
+            raise self._error(f"Unexpected {self._token()}")
+
+    @staticmethod
+    def tokenize(expression):
+        """
+        split an expression into (kind, token) pairs, kind is paren, clause or keyword
+        :param str expression: expression to split
+        :return: list of (kind, token), a clause token is (field, operator, value)
+        :rtype: list
+        """
+        tokens = list()
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = TOKEN.match(expression, position)
+            if not match:
+                raise ValueError(f"Invalid expression at {position + 1}: {expression[position:]}")
+            if match.group("paren"):
+                tokens.append(("paren", match.group("paren")))
+            elif match.group("field"):
+                value = match.group("value")
+                if value[0] in "\"'":
+                    value = value[1:-1].replace("\\" + value[0], value[0])
+                tokens.append(("clause", (match.group("field").lower(), match.group("op"), value)))
+            elif match.group("word").upper() in KEYWORDS:
+                tokens.append(("keyword", match.group("word").upper()))
+            else:
+                raise ValueError(f"Invalid expression at {position + 1}: {match.group('word')}")
+            position = match.end()
+        return tokens
+
+    def evaluate(self, bc, bits):
+        """
+        evaluate the expression in one pass over the bitset indexes. AND evaluates its cheapest
+        clauses first and narrows the candidates of the rest, OR only checks the cats not matched
+        yet, so name and description regexes run on as few cats as possible.
+        :param Bc bc: catalog to search
+        :param int bits: bitset of candidate cat positions
+        :return: bitset of matching cat positions
+        :rtype: int
+        """
+        return self._evaluate(self.tree, bc, bits)
+
+    def _evaluate(self, node, bc, bits):
+        """
+        helper method that evaluates one node of the tree against the candidates in bits
+        :param tuple node: ("and", children), ("or", children), ("not", child) or ("clause", field, search)
+        :param Bc bc: catalog to search
+        :param int bits: bitset of candidate cat positions
+        :return: bitset of matching cat positions, always a subset of bits
+        :rtype: int
+        """
+        kind = node[0]
+        if kind == "and":
+            for child in sorted(node[1], key=lambda child: self._rank(child, bc)):
+                if not bits:
+                    break
+                bits = self._evaluate(child, bc, bits)
+            return bits
+        if kind == "or":
+            result = 0
+            for child in node[1]:
+                result |= self._evaluate(child, bc, bits & ~result)
+            return result
+        if kind == "not":
+            return bits & ~self._evaluate(node[1], bc, bits)
+
+        field, search = node[1], node[2]
+        with bc.stage(f"expression {field}"):
+            return bc.find_bits(field, search, bits)
+
+    def _rank(self, node, bc):
+        """
+        helper method that orders the children of AND, indexed clauses by estimated cat count, then
+        subexpressions, then scans
+        :param tuple node: node of the tree
+        :param Bc bc: catalog to plan against
+        :return: sort key
+        :rtype: tuple
+        """
+        if node[0] != "clause":
+            return 1, 0
+        if node[1] in SCAN_FIELDS:
+            return 2, SCAN_FIELDS.index(node[1])
+        return 0, bc.estimate(node[1], node[2])
+
+    def _clause(self, field, operator, value):
+        """
+        helper method that turns a clause into a node, = becomes an anchored regex so every field
+        is searched with its find_* semantics
+        :param str field: field name
+        :param str operator: clause operator
+        :param str value: value or regex
+        :return: node
+        :rtype: tuple
+        """
+        if field not in INDEXED_FIELDS + SCAN_FIELDS:
+            raise self._error(f"Unknown field {field}, expected one of {', '.join(INDEXED_FIELDS + SCAN_FIELDS)}")
+        negate = operator in ("!=", "!~")
+        if field == "cost":
+            if operator in ("~", "!~"):
+                raise self._error(f"Invalid operator {operator} for cost")
+            search = value if operator in ("=", "==", "!=") else f"{operator}{value}"
+        elif operator in ("=", "==", "!="):
+            search = f"^{re.escape(value)}$"
+        elif operator in ("~", "!~"):
+            search = value
+        else:
+            raise self._error(f"Invalid operator {operator} for {field}")
+        node = ("clause", field, search)
+        return ("not", node) if negate else node
+
+    def _error(self, message):
+        """
+        helper method that builds the error for an invalid expression
+        :param str message: what is wrong
+        :return: error to raise
+        :rtype: ValueError
+        """
+        return ValueError(f"{message} in expression: {self.expression}")
+
+    def _token(self):
+        """
+        helper method that describes the next token for errors
+        :return: next token as written, end at the end of the expression
+        :rtype: str
+        """
+        if self.position >= len(self.tokens):
+            return "end"
+        token = self.tokens[self.position][1]
+        return "".join(token) if isinstance(token, tuple) else token
+
+    def _next(self, kind=None, token=None):
+        """
+        helper method that consumes the next token if it is of kind and equals token
+        :param str kind: optional token kind
+        :param str token: optional token
+        :return: the consumed token, None if the next token does not match
+        """
+        if self.position < len(self.tokens):
+            next_kind, next_token = self.tokens[self.position]
+            if (kind is None or kind == next_kind) and (token is None or token == next_token):
+                self.position += 1
+                return next_token
+        return None
+
+    def _parse_or(self):
+        """
+        helper method that parses and_expression (OR and_expression)*
+        :return: node
+        :rtype: tuple
+        """
+        children = [self._parse_and()]
+        while self._next("keyword", "OR"):
+            children.append(self._parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def _parse_and(self):
+        """
+        helper method that parses not_expression (AND not_expression)*
+        :return: node
+        :rtype: tuple
+        """
+        children = [self._parse_not()]
+        while self._next("keyword", "AND"):
+            children.append(self._parse_not())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def _parse_not(self):
+        """
+        helper method that parses NOT* (clause | "(" or_expression ")")
+        :return: node
+        :rtype: tuple
+        """
+        if self._next("keyword", "NOT"):
+            return "not", self._parse_not()
+        if self._next("paren", "("):
+            node = self._parse_or()
+            if not self._next("paren", ")"):
+                raise self._error("Missing )")
+            return node
+        clause = self._next("clause")
+        if clause is None:
+            raise self._error(f"Expected a clause, found {self._token()}")
+        return self._clause(*clause)
@@ -0,0 +1,201 @@
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+from array import array
+from cat import compile_search
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from multiprocessing import shared_memory
+import os
+
+# columns scanned with a regex by the workers, the other searches use the bitset indexes
+SCAN_FIELDS = ("name", "description")
+# below this many candidate cats a scan runs in the calling process, the pool would only add overhead
+MIN_PARALLEL = 2000
+# shards per worker, more shards even out the work when matches cluster in part of the catalog
+SHARDS_PER_JOB = 4
+
+# columns attached by each worker process, field -> (SharedMemory, offsets, data)
+_columns = dict()
+
+
+class ParallelExecutor:
+    def __init__(self, bc, jobs=None, min_parallel=MIN_PARALLEL):
+        """
+        run the name and description scans of a Query across a pool of worker processes. the
+        columns are written once to shared memory as utf-8 text with an offset per cat, the workers
+        attach to them by name, so nothing is copied per search and bc.json is not read again.
+        use as a context manager or call close, the shared memory is released when closed.
+        :param Bc bc: loaded catalog
+        :param int jobs: worker processes, defaults to the cpu count
+        :param int min_parallel: fewest candidate cats scanned by the pool
+        """
+        self.logger = logging.getLogger("bc")
+        self.bc = bc
+        self.jobs = jobs or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self.version = bc.version
+        self.memory = dict()
+        specs = dict()
+        try:
+            for field in SCAN_FIELDS:
+                memory = _share_column([getattr(cat, field) for cat in bc.cats])
+                self.memory[field] = memory
+                specs[field] = (memory.name, len(bc.cats))
+            self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=_attach, initargs=(specs,))
+        except BaseException:
+            self._release()
+            raise
+        self.logger.info(f"Parallel executor with {self.jobs} workers over {len(bc.cats)} cats")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        stop the workers and release the shared memory
+        :return: None
+        """
+        self.pool.shutdown()
+        self._release()
+
+    def run(self, query):
+        """
+        run a Query like Query.run. the indexed searches run here in plan order, then every shard of
+        the remaining candidates runs the whole chain of name and description scans in one worker,
+        the ranked fuzzy and text searches run last. family scoped queries run with Query.run.
+        :param Query query: query to run
+        :return: list of Cats in catalog order, or ranked by fuzzy or text, None if there are no searches
+        :rtype: list
+        """
+        if query.family or not query.predicates:
+            return query.run(self.bc)
+        if self.bc.version != self.version:
+            raise RuntimeError("Catalog was reloaded, create a new ParallelExecutor")
+
+        plan = query.plan(self.bc)
+        self.logger.debug(f"Parallel plan = {', '.join(f'{field} (~{estimate})' for field, search, estimate in plan)}")
+        bits = (1 << len(self.bc.cats)) - 1
+        scans = list()
+        ranked = list()
+        for field, search, estimate in plan:
+            if field in SCAN_FIELDS:
+                scans.append((field, search))
+            elif field in ("fuzzy", "text"):
+                ranked.append((field, search))
+            elif bits:
+                with self.bc.stage(f"find_{field}"):
+                    if field == "expression":
+                        bits = self.bc._to_bits(self.bc.find_expression(search, self.bc._to_cats(bits)))
+                    else:
+                        bits = self.bc.find_bits(field, search, bits)
+        if scans and bits:
+            with self.bc.stage("parallel_scan"):
+                bits = self.scan(scans, bits)
+        cats = self.bc._to_cats(bits)
+        for field, search in ranked:
+            if not cats:
+                break
+            cats = getattr(self.bc, f"find_{field}")(search, cats)
+        return cats
+
+    def scan(self, scans, bits):
+        """
+        find the cats in bits matching every (field, search) regex of scans
+        :param list scans: (field, search) pairs, field is one of SCAN_FIELDS
+        :param int bits: bitset of candidate cat positions
+        :return: bitset of matching cat positions
+        :rtype: int
+        """
+        for field, search in scans:
+            # check the regex here, a bad one should not fail in every worker
+            compile_search(search)
+        if bits.bit_count() < self.min_parallel:
+            for field, search in scans:
+                bits = self.bc.find_bits(field, search, bits)
+            return bits
+
+        count = len(self.bc.cats)
+        size = max(1, -(-count // (self.jobs * SHARDS_PER_JOB)))
+        futures = list()
+        for start in range(0, count, size):
+            end = min(count, start + size)
+            shard_bits = (bits >> start) & ((1 << (end - start)) - 1)
+            if shard_bits:
+                futures.append((start, self.pool.submit(_scan_shard, scans, start, end, shard_bits)))
+        result = 0
+        for start, future in futures:
+            result |= future.result() << start
+        self.bc.count("regex_match", bits.bit_count() * len(scans))
+        return result
+
+    def _release(self):
+        """
+        helper method that closes and removes the shared memory
+        :return: None
+        """
+        for memory in self.memory.values():
+            memory.close()
+            memory.unlink()
+        self.memory = dict()
+
+
+def _share_column(values):
+    """
+    write a column of strings to a new shared memory block, n + 1 offsets followed by the utf-8 text
+    :param list values: one string per cat
+    :return: shared memory block
+    :rtype: shared_memory.SharedMemory
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = array("q", [0])
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    header = offsets.tobytes()
+    memory = shared_memory.SharedMemory(create=True, size=max(1, len(header) + offsets[-1]))
+    memory.buf[:len(header)] = header
+    position = len(header)
+    for value in encoded:
+        memory.buf[position:position + len(value)] = value
+        position += len(value)
+    return memory
+
+
+def _attach(specs):
+    """
+    worker initializer, attach to the shared columns without copying them
+    :param dict specs: field -> (shared memory name, cat count)
+    :return: None
+    """
+    for field, (name, count) in specs.items():
+        # workers share the resource tracker of the executor's process, which removes the block on close
+        memory = shared_memory.SharedMemory(name=name)
+        header = 8 * (count + 1)
+        _columns[field] = (memory, memory.buf[:header].cast("q"), memory.buf[header:])
+
+
+def _scan_shard(scans, start, end, bits):
+    """
+    worker task, run a chain of regex scans over the cats start to end
+    :param list scans: (field, search) pairs
+    :param int start: first cat position of the shard
+    :param int end: position after the last cat of the shard
+    :param int bits: bitset of candidate cats, bit 0 is cat start
+    :return: bitset of matching cats, bit 0 is cat start
+    :rtype: int
+    """
+    for field, search in scans:
+        pattern = compile_search(search)
+        memory, offsets, data = _columns[field]
+        result = ["0"] * (end - start)
+        # bit n of bits is character n of the reversed binary string
+        for position, bit in enumerate(bin(bits)[:1:-1]):
+            if bit == "1":
+                cat = start + position
+                if pattern.search(str(data[offsets[cat]:offsets[cat + 1]], "utf-8")):
+                    result[position] = "1"
+        bits = int("".join(reversed(result)) or "0", 2)
+    return bits
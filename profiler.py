@@ -0,0 +1,71 @@
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+import contextlib
+import json
+import time
+from cat import compile_search
+
+
+class Profiler:
+    def __init__(self):
+        """
+        collect wall time and call counts per stage and named counters
+        """
+        self.stages = dict()
+        self.counters = dict()
+        self._compiles = compile_search.cache_info().misses
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        time a stage, nested stages are timed separately and included in their parent's time
+        :param str name: stage name
+        :return: context manager
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            calls, seconds = self.stages.get(name, (0, 0.0))
+            self.stages[name] = (calls + 1, seconds + time.perf_counter() - start)
+
+    def count(self, name, count=1):
+        """
+        add to a counter, e.g. regex matches
+        :param str name: counter name
+        :param int count: amount to add
+        :return: None
+        """
+        self.counters[name] = self.counters.get(name, 0) + count
+
+    def report(self):
+        """
+        return stages and counters, including the regexes compiled since the Profiler was created
+        :return: {"stages": {name: {"calls", "seconds"}}, "counters": {name: count}}
+        :rtype: dict
+        """
+        counters = dict(self.counters)
+        counters["regex_compile"] = compile_search.cache_info().misses - self._compiles
+        return {
+            "stages": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.stages.items()},
+            "counters": counters
+        }
+
+    def format(self, output="table"):
+        """
+        format the report as a table or json
+        :param str output: table or json
+        :return: formatted report
+        :rtype: str
+        """
+        report = self.report()
+        if output == "json":
+            return json.dumps(report, indent=4)
+        lines = [f"{'stage':<32} {'calls':>8} {'ms':>12}"]
+        for name, stage in report["stages"].items():
+            lines.append(f"{name:<32} {stage['calls']:>8} {stage['seconds'] * 1000:>12.3f}")
+        lines.append(f"{'counter':<32} {'count':>8}")
+        for name, count in sorted(report["counters"].items()):
+            lines.append(f"{name:<32} {count:>8}")
+        return "\n".join(lines)
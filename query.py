@@ -0,0 +1,67 @@
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+import logging
+
+
+class Query:
+    # searches supported by Query, each maps to a Bc.find_* method
+    FIELDS = ("name", "rarity", "cost", "target", "ability", "effect", "ability_effect", "description", "form",
+              "expression", "fuzzy", "text")
+    # searches that run a regex over every candidate cat, cheapest first. they always run after
+    # the indexed searches so they scan as few cats as possible. the ranked fuzzy and text searches
+    # run last to keep their ranking.
+    SCAN_FIELDS = ("name", "description", "fuzzy", "text")
+
+    def __init__(self, family=False, **kwargs):
+        """
+        collect the requested searches, keys that are not in FIELDS or have no value are ignored.
+        :param bool family: family scoped, every search matches whole families where any form matches
+        :param kwargs: search strings by field, e.g. rarity="uber", target="red"
+        """
+        self.logger = logging.getLogger("bc")
+        self.family = bool(family)
+        self.predicates = {field: kwargs[field] for field in self.FIELDS if kwargs.get(field)}
+
+    def plan(self, bc):
+        """
+        order the searches so the cheapest and most selective run first. indexed searches are
+        ordered by their estimated cat count, scan searches follow in SCAN_FIELDS order.
+        :param Bc bc: catalog to plan against
+        :return: list of (field, search, estimated cat count)
+        :rtype: list
+        """
+        steps = list()
+        for field, search in self.predicates.items():
+            estimate = bc.estimate(field, search)
+            if field in self.SCAN_FIELDS:
+                rank = (1, self.SCAN_FIELDS.index(field))
+            else:
+                rank = (0, estimate)
+            steps.append((rank, field, search, estimate))
+        steps.sort(key=lambda step: step[0])
+        return [(field, search, estimate) for rank, field, search, estimate in steps]
+
+    def run(self, bc):
+        """
+        run the searches in plan order, stops as soon as no cats are left. family scoped searches
+        widen each result to every form of the families found before the next search.
+        :param Bc bc: catalog to search
+        :return: list of Cats, None if there are no searches
+        :rtype: list
+        """
+        if not self.predicates:
+            return None
+
+        plan = self.plan(bc)
+        self.logger.debug(f"Query plan = {', '.join(f'{field} (~{estimate})' for field, search, estimate in plan)}")
+        cats = None
+        for field, search, estimate in plan:
+            with bc.stage(f"find_{field}"):
+                cats = getattr(bc, f"find_{field}")(search, cats)
+                if self.family:
+                    cats = bc.expand_families(cats)
+            self.logger.debug(f"Cat count after {field} = {len(cats)} (estimated {estimate})")
+            if not cats:
+                break
+        return cats
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+from bc import Bc
+from bc import InputError
+from bc import SEARCH_OPTIONS
+from expression import parse_expression
+from query import Query
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import re
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+# find_* methods exposed as /find/<field>?q=<search>
+FIND_FIELDS = ("ability", "ability_effect", "cost", "description", "effect", "expression", "form", "fuzzy", "name",
+               "rarity", "target", "text")
+# searches that run a regex over every candidate cat or score the description text index
+EXPENSIVE_FIELDS = ("description", "name", "text")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class Server:
+    def __init__(self, bc, max_expensive=4):
+        """
+        HTTP JSON API over one loaded catalog. connections are kept alive, expensive searches run in
+        worker threads and at most max_expensive of them run at once.
+        :param Bc bc: loaded catalog
+        :param int max_expensive: concurrent name, description and text searches
+        """
+        self.logger = logging.getLogger("bc")
+        self.bc = bc
+        self.expensive = asyncio.Semaphore(max_expensive)
+
+    async def handle(self, reader, writer):
+        """
+        serve http/1.1 requests on one connection until the client closes it
+        :param asyncio.StreamReader reader: connection reader
+        :param asyncio.StreamWriter writer: connection writer
+        :return: None
+        """
+        try:
+            while True:
+                try:
+                    # readline raises ValueError for lines over the stream limit
+                    request_line = await reader.readline()
+                    if not request_line.strip():
+                        break
+                    method, target, version = request_line.decode("latin-1").split(maxsplit=2)
+                    headers = dict()
+                    while True:
+                        line = await reader.readline()
+                        if not line.strip():
+                            break
+                        key, _, value = line.decode("latin-1").partition(":")
+                        headers[key.strip().lower()] = value.strip()
+                    if "content-length" in headers:
+                        await reader.readexactly(int(headers["content-length"]))
+                except ValueError as e:
+                    # the rest of the stream cannot be trusted, answer and close
+                    await self.write(writer, 400, {"error": f"Invalid request: {e}"}, False)
+                    break
+
+                try:
+                    status, body = await self.respond(method, target)
+                except Exception as e:
+                    # answer instead of dropping the connection, the error is logged for the maintainer
+                    self.logger.exception(f"Error answering {method} {target}")
+                    status, body = 500, {"error": f"Internal error: {type(e).__name__}"}
+                keep_alive = headers.get("connection", "").lower() != "close" and version.strip() == "HTTP/1.1"
+                await self.write(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def write(writer, status, body, keep_alive):
+        """
+        write one json response
+        :param asyncio.StreamWriter writer: connection writer
+        :param int status: http status
+        :param body: json body
+        :param bool keep_alive: keep the connection open after the response
+        :return: None
+        """
+        data = json.dumps(body).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+    async def respond(self, method, target):
+        """
+        route one request
+        :param str method: http method, only GET is supported
+        :param str target: request path and query string
+        :return: (http status, json body)
+        :rtype: tuple
+        """
+        if method != "GET":
+            return 405, {"error": f"Method {method} is not supported."}
+
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+        if path == "/stats":
+            return 200, self.bc.stats()
+        if path == "/list":
+            return 200, [{"name": cat.name, "rarity": cat.rarity, "rarity_pct": cat.rarity_pct} for cat in self.bc.cats]
+        if path in ("/search", "/facets"):
+            unknown = [key for key in params if key not in Query.FIELDS + SEARCH_OPTIONS]
+            if unknown:
+                return 400, {"error": f"Unknown parameter(s) {', '.join(unknown)}, "
+                                      f"expected some of {', '.join(Query.FIELDS + SEARCH_OPTIONS)}"}
+            search = functools.partial(self.bc.search, **params)
+            expensive = any(self.is_expensive(field, params[field]) for field in params)
+        elif path.startswith("/find/") and path[len("/find/"):] in FIND_FIELDS and "q" in params:
+            field = path[len("/find/"):]
+            search = functools.partial(getattr(self.bc, f"find_{field}"), params["q"])
+            expensive = self.is_expensive(field, params["q"])
+        else:
+            return 404, {"error": f"Unknown path {url.path}"}
+
+        try:
+            if expensive:
+                async with self.expensive:
+                    cats = await asyncio.get_running_loop().run_in_executor(None, search)
+            else:
+                cats = search()
+        except (InputError, TypeError, ValueError, re.error) as e:
+            return 400, {"error": str(e)}
+        if path == "/facets":
+            # no search, facets of the whole catalog
+            facets = self.bc.facets(cats)
+            return 200, {"count": len(self.bc.cats if cats is None else cats), "facets": facets}
+        cats = cats or []
+        return 200, {"count": len(cats), "cats": [cat.to_dict() for cat in cats]}
+
+    @staticmethod
+    def is_expensive(field, search):
+        """
+        tell whether a search counts against the limit of concurrent expensive searches
+        :param str field: search field, e.g. name or expression
+        :param str search: search string
+        :return: True for searches of EXPENSIVE_FIELDS and expressions with such a clause
+        :rtype: bool
+        """
+        if field == "expression":
+            try:
+                return bool(parse_expression(search).fields & set(EXPENSIVE_FIELDS))
+            except ValueError:
+                # fails fast in find_expression
+                return False
+        return field in EXPENSIVE_FIELDS
+
+    async def serve(self, host, port):
+        """
+        accept connections until cancelled
+        :param str host: address to listen on
+        :param int port: port to listen on
+        :return: None
+        """
+        server = await asyncio.start_server(self.handle, host, port)
+        self.logger.info(f"Serving http on {', '.join(str(sock.getsockname()) for sock in server.sockets)}")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Battle Cats, HTTP JSON API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", "-p", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--max-expensive", type=int, default=4, help="Concurrent name, description and text searches")
+    args = parser.parse_args()
+    try:
+        asyncio.run(Server(Bc("bc.json", "bc.snapshot"), args.max_expensive).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
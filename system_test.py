@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+import argparse
+import bc_cli
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import io
+import multiprocessing
+import re
+import time
+
+# the cases are kept in test_bc.sh, ["arguments"]="grep pattern"
+CASES_FILE = "test_bc.sh"
+CASE = re.compile(r'^\s*\["(.*)"\]="(.*)"\s*$')
+
+
+def read_cases(cases_file):
+    """
+    read the system test cases of test_bc.sh
+    :param str cases_file: test_bc.sh
+    :return: list of (arguments, grep pattern)
+    :rtype: list
+    """
+    cases = list()
+    with open(cases_file) as fh:
+        for line in fh:
+            match = CASE.match(line)
+            if match:
+                cases.append((match.group(1), match.group(2)))
+    return cases
+
+
+def grep_pattern(pattern):
+    """
+    convert a grep basic regular expression to a python regex. in a basic regex ( ) { } | + ? are
+    literal unless escaped.
+    :param str pattern: grep pattern
+    :return: compiled regex
+    :rtype: re.Pattern
+    """
+    result = list()
+    escaped = False
+    for char in pattern:
+        if escaped:
+            result.append(char if char in "(){}|+?" else "\\" + char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in "(){}|+?":
+            result.append("\\" + char)
+        else:
+            result.append(char)
+    return re.compile("".join(result))
+
+
+def run_case(arguments, pattern):
+    """
+    run one case in this process with bc_cli.main and grep its output
+    :param str arguments: command line, split on whitespace like the unquoted $key of test_bc.sh
+    :param str pattern: grep pattern one output line must match
+    :return: (arguments, passed, seconds, output)
+    :rtype: tuple
+    """
+    output = io.StringIO()
+    start = time.perf_counter()
+    # argparse writes usage errors to stderr, keep them with the output
+    with contextlib.redirect_stderr(output):
+        bc_cli.main(arguments.split(), output)
+    seconds = time.perf_counter() - start
+    regex = grep_pattern(pattern)
+    passed = any(regex.search(line) for line in output.getvalue().splitlines())
+    return arguments, passed, seconds, output.getvalue()
+
+
+def _run_case(case):
+    """
+    helper function for the worker pool
+    :param tuple case: (arguments, grep pattern)
+    :return: see run_case
+    :rtype: tuple
+    """
+    return run_case(*case)
+
+
+def run_cases(cases, jobs=None):
+    """
+    run the cases in this process and a pool of forked workers. cases that regenerate the target run
+    first, one at a time, then the catalog is loaded once and the workers are forked so they inherit it
+    instead of each loading bc.json again, whatever the default start method is.
+    :param list cases: list of (arguments, grep pattern)
+    :param int jobs: worker processes, defaults to the cpu count
+    :return: list of (arguments, passed, seconds, output) in the order of cases
+    :rtype: list
+    """
+    generate = [case for case in cases if {"-g", "--generate"} & set(case[0].split())]
+    results = {case: run_case(*case) for case in generate}
+    bc_cli.loaded_bc(bc_cli.update_target(bc_cli.build_parser().parse_args([])))
+    rest = [case for case in cases if case not in results]
+    if jobs == 1 or len(rest) < 2:
+        results.update(zip(rest, map(_run_case, rest)))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+            results.update(zip(rest, executor.map(_run_case, rest)))
+    return [results[case] for case in cases]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the test_bc.sh system tests in process.")
+    parser.add_argument("--cases", default=CASES_FILE, help="File with the cases")
+    parser.add_argument("--jobs", "-j", type=int, help="Worker processes, defaults to the cpu count")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Print the output of failed cases")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_cases(read_cases(args.cases), args.jobs)
+    duration = time.perf_counter() - start
+    failures = [result for result in results if not result[1]]
+    for arguments, passed, seconds, output in results:
+        print(f"{'ok' if passed else 'FAIL':<6}{seconds * 1000:>10.1f} ms  ./bc {arguments}")
+    print("")
+    print(f"Ran {len(results)} tests in {duration:.2f} seconds with {len(failures)} failure(s)")
+    cases = dict(read_cases(args.cases))
+    for arguments, passed, seconds, output in failures:
+        print(f"  ./bc {arguments}")
+        print(f"    expected: {cases[arguments]}")
+        if args.verbose:
+            print("    output: " + output.replace("\n", "\n      "))
+    exit(1 if failures else 0)
@@ -1,13 +1,22 @@
+import os
 from os import path
+import shutil
 import sys
+import tempfile
 import unittest
 sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
 from bc import Bc
+from bc import InputError
+from bc import SORT_KEYS
+from profiler import Profiler
 
 
 class TestBC(unittest.TestCase):
     test_file = "bc.json"
-    bc = Bc(test_file)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bc = Bc(cls.test_file)
 
     def test_ability(self):
         cat = None
@@ -20,6 +29,12 @@ class TestBC(unittest.TestCase):
         self.assertIn("Strengthen", cat.ability)
         self.assertIn("Single Attack", cat.ability)
 
+    def test_ability_effect_or(self):
+        # ability OR effect, no duplicates, catalog order
+        cats = self.bc.find_ability_effect("Knockback|Area Attack")
+        expected = [cat for cat in self.bc.cats if cat.get_ability_effect("Knockback|Area Attack")]
+        self.assertListEqual(expected, cats)
+
     def test_ability_effect(self):
         # search for ability and effect
         cat = None
@@ -42,8 +57,8 @@ class TestBC(unittest.TestCase):
                 break
         self.assertEqual("Chill Cat", cat.name)
         self.assertIn("Area Attack", cat.ability)
-        self.assertListEqual(["Wheel Cat", "Solar Cat"], cat.alias)
-        self.assertListEqual([1050, 1020], cat.cost)
+        self.assertTupleEqual(("Wheel Cat", "Solar Cat"), cat.alias)
+        self.assertTupleEqual((1050, 1020), cat.cost)
         self.assertEqual("An evolved Cat who is always calm and collected at the office. "
                          "Massive area damage to Aliens.", cat.description)
         self.assertIn("Massive Damage", cat.effect)
@@ -51,6 +66,24 @@ class TestBC(unittest.TestCase):
         self.assertEqual("Rare", cat.rarity)
         self.assertIn("Alien", cat.target)
 
+    def test_cat_compact(self):
+        # slotted cats share interned strings and tuples, forms share the family names
+        cats = self.bc.find_name("^(Tank|Wall|Eraser) Cat$")
+        self.assertEqual(3, len(cats))
+        self.assertFalse(hasattr(cats[0], "__dict__"))
+        self.assertFalse(hasattr(cats[0], "cat"))
+        self.assertIs(cats[0].family, cats[1].family)
+        self.assertIs(cats[1].family, cats[2].family)
+        self.assertIs(cats[0].ability, cats[2].ability)
+        self.assertIs(cats[0].rarity, cats[1].rarity)
+        self.assertTupleEqual(("Tank Cat", "Eraser Cat"), cats[1].alias)
+
+    def test_cost_deduplicated(self):
+        # Chill Cat has two costs in the range but is returned once
+        cats = self.bc.find_cost("1000..1100")
+        self.assertEqual(1, len([cat for cat in cats if cat.name == "Chill Cat"]))
+        self.assertEqual(len(cats), len(set(cats)))
+
     def test_cost_equal(self):
         cat = None
         cats = self.bc.find_cost("=150")
@@ -95,6 +128,12 @@ class TestBC(unittest.TestCase):
         self.assertEqual("Killer Cat", cat.name)
         self.assertEqual(7500, cat.cost)
 
+    def test_cost_invalid(self):
+        with self.assertRaises(InputError):
+            self.bc.find_cost("!= 75")
+        with self.assertRaises(InputError):
+            self.bc.find_cost("__import__('os')")
+
     def test_cost_less_than(self):
         cats = self.bc.find_cost("<45")
         self.assertListEqual([], cats)
@@ -123,6 +162,15 @@ class TestBC(unittest.TestCase):
         self.assertEqual("Li'l Mohawk Cat", cat.name)
         self.assertEqual(45, cat.cost)
 
+    def test_cost_range(self):
+        cats = self.bc.find_cost("45..75")
+        self.assertTrue(cats)
+        for cat in cats:
+            costs = cat.cost if isinstance(cat.cost, tuple) else [cat.cost]
+            self.assertTrue(any(45 <= cost <= 75 for cost in costs))
+        self.assertListEqual(self.bc.find_cost(">=45", self.bc.find_cost("<=75")), cats)
+        self.assertListEqual([], self.bc.find_cost("75..45"))
+
     def test_description(self):
         cat = None
         cats = self.bc.find_description("Brilliant Bow can grant")
@@ -132,6 +180,20 @@ class TestBC(unittest.TestCase):
                 break
         self.assertEqual("Megaphrodite", cat.name)
 
+    def test_description_index(self):
+        # plain text uses the full-text index and matches exactly what the regex scan matches
+        for description in ("ave att", "Resistant to Red", "o", "Baseball", "cat's", "!"):
+            self.assertListEqual([cat for cat in self.bc.cats if cat.get_description(description)],
+                                 self.bc.find_description(description))
+
+        # multi-word text only runs the regex on the index candidates
+        profiler = Profiler()
+        bc = Bc(self.test_file, profiler=profiler)
+        self.assertEqual(1, len(bc.find_description("Brilliant Bow can grant")))
+        self.assertLess(profiler.counters["regex_match"], 10)
+        bc.find_description("Brilliant.Bow")
+        self.assertGreaterEqual(profiler.counters["regex_match"], len(bc.cats))
+
     def test_effect(self):
         cat = None
         cats = self.bc.find_effect("Freeze")
@@ -143,6 +205,64 @@ class TestBC(unittest.TestCase):
         self.assertIn("Freeze", cat.effect)
         self.assertIn("Resistant", cat.effect)
 
+    def test_facets(self):
+        cats = self.bc.find_target("Red", self.bc.find_rarity("Uber"))
+        facets = self.bc.facets(cats)
+        for ability, count in facets["ability"].items():
+            self.assertEqual(len([cat for cat in cats if ability in cat.ability]), count)
+        self.assertEqual(set(ability for cat in cats for ability in cat.ability), set(facets["ability"]))
+        self.assertDictEqual({"Uber": len(cats)}, facets["rarity"])
+        self.assertEqual(len(cats), sum(facets["form"].values()))
+        low, high = next(iter(facets["cost"])).split("..")
+        self.assertEqual(len(self.bc.find_cost(f"{low}..{high}", cats)), next(iter(facets["cost"].values())))
+        self.assertDictEqual(self.bc.facets(self.bc.cats), self.bc.facets())
+        self.assertDictEqual({"form": {}}, self.bc.facets([], fields=("form",)))
+        with self.assertRaises(InputError):
+            self.bc.facets(fields=("name",))
+
+    def test_family(self):
+        # forms are views of one family holding the shared fields
+        cats = self.bc.find_name("^(Cat|Macho Cat|Mohawk Cat)$")
+        family = cats[0].family
+        self.assertListEqual(cats, family.forms)
+        self.assertEqual(("Cat", "Macho Cat", "Mohawk Cat"), family.names)
+        self.assertEqual(("Cat", "Mohawk Cat"), cats[1].alias)
+        self.assertEqual(family.rarity_pct, cats[2].rarity_pct)
+        self.assertEqual(len(self.bc.families), len(self.bc.group_families(self.bc.cats)))
+        self.assertEqual(len(self.bc.cats), sum(len(family.forms) for family in self.bc.families))
+
+        self.assertListEqual([family], self.bc.group_families(cats))
+        self.assertListEqual(cats, self.bc.expand_families(cats[2:]))
+
+    def test_family_missing_form(self):
+        # a family without a Normal form is still one family with its names in form order
+        bc = Bc(self.test_file)
+        record = {"cost": 100, "ability": [""], "effect": [""], "target": [""], "description": "", "rarity": "Test",
+                  "rarity_index": 1, "rarity_pct": 1.0, "rarity_total": 1}
+        bc.load_cats([dict(record, name="B", alias=["C"], form="Evolved"),
+                      dict(record, name="C", alias=["B"], form="True")])
+        cats = bc.find_rarity("^Test$")
+        self.assertEqual(1, len(bc.group_families(cats)))
+        self.assertEqual(("B", "C"), cats[0].family.names)
+        self.assertEqual(("C",), cats[0].alias)
+        self.assertListEqual(cats, bc.expand_families(cats[1:]))
+
+    def test_family_search(self):
+        # each search may match a different form of the family
+        cats = self.bc.search(family=True, ability="wave", effect="freeze")
+        families = [family for family in self.bc.families
+                    if any(cat.get_ability("wave") for cat in family.forms)
+                    and any(cat.get_effect("freeze") for cat in family.forms)]
+        self.assertListEqual(families, self.bc.group_families(cats))
+        self.assertListEqual([cat for family in families for cat in family.forms], cats)
+        self.assertNotEqual(cats, self.bc.search(ability="wave", effect="freeze"))
+        # query string flags are parsed
+        self.assertListEqual(cats, self.bc.search(family="true", ability="wave", effect="freeze"))
+        self.assertListEqual(self.bc.search(ability="wave", effect="freeze"),
+                             self.bc.search(family="false", ability="wave", effect="freeze"))
+        with self.assertRaises(InputError):
+            self.bc.search(family="maybe", ability="wave")
+
     def test_form(self):
         # test normal cat where index, rarity_pct, and rarity_total is unlikely to change.
         cat = None
@@ -157,6 +277,31 @@ class TestBC(unittest.TestCase):
         self.assertEqual(0.1111111111111111, cat.rarity_pct)
         self.assertEqual(9, cat.rarity_total)
 
+    def test_fuzzy(self):
+        # typos and aliases find the whole family
+        cats = self.bc.find_fuzzy("Wargod Keji")
+        self.assertListEqual(["Maeda Keiji", "Wargod Keiji", "Immortal Keiji"], [cat.name for cat in cats][:3])
+        self.assertEqual("Wargod Keiji", self.bc.find_fuzzy("wargod", self.bc.find_form("True"))[0].alias[1])
+        self.assertEqual(2, len(self.bc.find_fuzzy("keji", limit=2)))
+
+    def test_index(self):
+        # every indexed value maps to the bitset of cats with that value
+        for cat_position, cat in enumerate(self.bc.cats):
+            self.assertEqual(cat_position, self.bc.positions[cat])
+            self.assertTrue(self.bc.index["form"][cat.form] & (1 << cat_position))
+        ubers = self.bc.find_rarity("Uber")
+        self.assertListEqual([cat for cat in self.bc.cats if cat.rarity == "Uber"], ubers)
+        self.assertEqual(len(ubers), bin(self.bc.index["rarity"]["Uber"]).count("1"))
+        self.assertListEqual([], self.bc.find_target("no such target"))
+
+    def test_match_values(self):
+        # regex is evaluated once per distinct value and memoized
+        values = self.bc.match_values("effect", "^(freeze|slow)$")
+        self.assertSetEqual({"Freeze", "Slow"}, values)
+        self.assertIs(values, self.bc.match_values("effect", "^(freeze|slow)$"))
+        cats = self.bc.find_effect("^(freeze|slow)$")
+        self.assertListEqual([cat for cat in self.bc.cats if cat.get_effect("^(freeze|slow)$")], cats)
+
     def test_name(self):
         cat = None
         cats = self.bc.find_name("thief cat")
@@ -165,8 +310,8 @@ class TestBC(unittest.TestCase):
             if cat.name == "Phantom Thief Cat":
                 break
         self.assertEqual("Phantom Thief Cat", cat.name)
-        self.assertListEqual(["Extra Money", "Single Attack"], cat.ability)
-        self.assertListEqual(["Thief Cat", "Goemon Cat"], cat.alias)
+        self.assertTupleEqual(("Extra Money", "Single Attack"), cat.ability)
+        self.assertTupleEqual(("Thief Cat", "Goemon Cat"), cat.alias)
         self.assertEqual(495, cat.cost)
         self.assertEqual("Moves too fast. Still steals the same. Has a large treasure collection now. "
                          "More money earned when defeating an enemy.", cat.description)
@@ -190,7 +335,98 @@ class TestBC(unittest.TestCase):
         self.assertEqual("Legend", cat.rarity)
         self.assertEqual("Evolved", cat.form)
         self.assertEqual(4050, cat.cost)
-        self.assertListEqual(["Metal"], cat.target)
+        self.assertTupleEqual(("Metal",), cat.target)
+
+    def test_search_cache(self):
+        bc = Bc(self.test_file)
+        cats = bc.search(rarity="Uber", target="red", cost="<=3000")
+        self.assertDictEqual({"hits": 0, "misses": 1, "size": 1, "maxsize": 256, "version": 1}, bc.cache_info())
+
+        # same normalized search is a hit
+        self.assertListEqual(cats, bc.search(cost="< 3001", target="RED", rarity="uber"))
+        self.assertEqual(1, bc.cache_info()["hits"])
+        # multi-word plain text is case folded too
+        self.assertListEqual(bc.search(name="Wall Cat"), bc.search(name="wall cat"))
+        self.assertEqual(2, bc.cache_info()["hits"])
+        # regex searches are not case folded
+        self.assertListEqual(bc.find_description("\\S"), bc.search(description="\\S"))
+        self.assertListEqual(bc.find_description("\\s"), bc.search(description="\\s"))
+        self.assertEqual(4, bc.cache_info()["misses"])
+
+        # loading cats invalidates
+        bc.load_cats([])
+        self.assertEqual(2, bc.cache_info()["version"])
+        self.assertListEqual(cats, bc.search(rarity="Uber", target="red", cost="<=3000"))
+        self.assertEqual(5, bc.cache_info()["misses"])
+
+    def test_page(self):
+        cats = self.bc.find_ability("wave")
+        for sort in SORT_KEYS:
+            expected = sorted(cats, key=SORT_KEYS[sort])
+            self.assertListEqual(expected, self.bc.page(cats, sort))
+            self.assertListEqual(expected[3:8], self.bc.page(cats, sort, limit=5, offset=3))
+        self.assertListEqual(cats[10:], self.bc.page(cats, offset=10))
+        self.assertListEqual([], self.bc.page(cats, "cost", limit=0))
+        self.assertListEqual(sorted(self.bc.cats, key=SORT_KEYS["cost"])[:10], self.bc.page(sort="cost", limit=10))
+        for sort, limit, offset in (("price", None, 0), (None, -1, 0), (None, 1, "x")):
+            with self.assertRaises(InputError):
+                self.bc.page(cats, sort, limit, offset)
+
+    def test_search_page(self):
+        cats = self.bc.search(ability="wave", sort="cost", limit=10)
+        self.assertListEqual(self.bc.page(self.bc.find_ability("wave"), "cost", 10), cats)
+        self.assertListEqual(self.bc.page(sort="name", limit=3, offset=1),
+                             self.bc.search(sort="name", limit="3", offset="1"))
+        self.assertIsNone(self.bc.search())
+
+    def test_profiler(self):
+        profiler = Profiler()
+        bc = Bc(self.test_file, profiler=profiler)
+        bc.search(name="Cat", rarity="uber")
+        report = profiler.report()
+        for stage in ("json_load", "load_cats", "build_index", "find_name", "find_rarity"):
+            self.assertEqual(1, report["stages"][stage]["calls"])
+        self.assertGreater(report["counters"]["regex_match"], 0)
+
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_file = path.join(tmp_dir, "bc.json")
+            snapshot_file = path.join(tmp_dir, "bc.snapshot")
+            shutil.copyfile(self.test_file, json_file)
+            Bc(json_file).save_snapshot(snapshot_file, json_file)
+
+            bc = Bc(json_file, snapshot_file)
+            self.assertIsNone(bc.json_cats)
+            self.assertListEqual([cat.name for cat in self.bc.cats], [cat.name for cat in bc.cats])
+            self.assertListEqual([cat.name for cat in self.bc.find_cost(">=45", self.bc.find_ability("wave"))],
+                                 [cat.name for cat in bc.find_cost(">=45", bc.find_ability("wave"))])
+            # families are expanded from the loaded cats
+            self.assertListEqual([cat.name for cat in self.bc.search(family=True, ability="wave")],
+                                 [cat.name for cat in bc.search(family=True, ability="wave")])
+
+            # a changed json makes the snapshot stale
+            with open(json_file, "a") as fh:
+                fh.write("\n")
+            self.assertFalse(Bc(json_file).load_snapshot(snapshot_file, json_file))
+            # a stale or missing snapshot is written again by the next load
+            profiler = Profiler()
+            Bc(json_file, snapshot_file, profiler)
+            self.assertIn("save_snapshot", profiler.report()["stages"])
+            self.assertTrue(Bc(json_file).load_snapshot(snapshot_file, json_file))
+            os.remove(snapshot_file)
+            Bc(json_file, snapshot_file)
+            self.assertTrue(path.exists(snapshot_file))
+
+    def test_stats(self):
+        stats = {"abilities": {}, "effects": {}, "rarities": {}, "targets": {}}
+        for cat in self.bc.cats:
+            for category, values in (("abilities", cat.ability), ("effects", cat.effect),
+                                     ("rarities", [cat.rarity]), ("targets", cat.target)):
+                for value in values:
+                    stats[category][value] = stats[category].get(value, 0) + 1
+        self.assertDictEqual(stats, self.bc.stats())
+        self.bc.stats()["rarities"].clear()
+        self.assertDictEqual(stats, self.bc.stats())
 
     def test_talent_ability(self):
         cat = None
@@ -310,6 +546,15 @@ class TestBC(unittest.TestCase):
             self.assertEqual("Uber", cat.rarity)
             self.assertIn("Immune to Weaken", cat.ability)
 
+    def test_text(self):
+        cats = self.bc.find_text("wave immun*")
+        self.assertTrue(cats)
+        for cat in cats:
+            self.assertRegex(cat.description.lower(), r"\bwave")
+            self.assertRegex(cat.description.lower(), r"\bimmun")
+        ubers = self.bc.find_text("wave immun*", self.bc.find_rarity("uber"))
+        self.assertListEqual([cat for cat in cats if cat.rarity == "Uber"], ubers)
+
     def test_wildcard(self):
         cat = None
         cats = self.bc.find_description("honor")
@@ -0,0 +1,38 @@
+import json
+from os import path
+import sys
+import unittest
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+    with open("bc_source.json") as fh:
+        source = json.load(fh)
+
+    def test_synthetic_source(self):
+        synthetic = benchmark.synthetic_source(self.source, 500)
+        families = [cat for cats in synthetic["cats"].values() for cat in cats]
+        self.assertEqual(500, len(families))
+        self.assertEqual(500, len({cat["name"][0] for cat in families}))
+        for cat in families:
+            self.assertRegex(cat["name"][0], r"^Synthetic Cat \d+$")
+        # same seed, same catalog
+        self.assertEqual(synthetic, benchmark.synthetic_source(self.source, 500))
+        self.assertGreater(len(synthetic["cats"]["uber"]), len(synthetic["cats"]["legend"]))
+
+    def test_run_benchmarks(self):
+        results = benchmark.run_benchmarks(self.source, 20, repeat=1)
+        for name, field, search in benchmark.FIND_BENCHMARKS:
+            self.assertIn(name, results)
+        self.assertIn("generate_bc_json", results)
+        self.assertIn("stats", results)
+
+    def test_compare(self):
+        baseline = {"1000": {"find_name": 1.0, "stats": 1.0}}
+        results = {"1000": {"find_name": 1.1, "stats": 1.5, "new": 9.0}, "10": {"stats": 9.0}}
+        self.assertListEqual([("1000", "stats", 1.0, 1.5)], benchmark.compare(results, baseline, 0.2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,220 @@
+import argparse
+import contextlib
+import io
+import json
+from os import path
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from bc import Bc
+import bc_cli
+
+
+class TestGenerate(unittest.TestCase):
+    source_file = "bc_source.json"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.source = path.join(self.tmp_dir, "bc_source.json")
+        self.target = path.join(self.tmp_dir, "bc.json")
+        self.manifest = path.join(self.tmp_dir, "bc_manifest.json")
+        shutil.copyfile(self.source_file, self.source)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_incremental(self):
+        bc_cli.generate_bc_json(self.source, self.target, manifest=self.manifest)
+        self.assertFalse(bc_cli.source_changed(self.source, self.target, self.manifest))
+
+        # unchanged content is not converted again
+        with open(self.source) as fh:
+            bc_source = json.load(fh)
+        with open(self.source, "w") as fh:
+            json.dump(bc_source, fh)
+        self.assertTrue(bc_cli.source_changed(self.source, self.target, self.manifest))
+        with mock.patch.object(bc_cli, "convert_cat", wraps=bc_cli.convert_cat) as convert_cat:
+            bc_cli.generate_bc_json(self.source, self.target, manifest=self.manifest)
+        self.assertEqual(0, convert_cat.call_count)
+        self.assertFalse(bc_cli.source_changed(self.source, self.target, self.manifest))
+
+        # only the changed family is converted and spliced into the target
+        bc_source["cats"]["uber"][0]["description"][0] = "Changed description"
+        with open(self.source, "w") as fh:
+            json.dump(bc_source, fh)
+        with mock.patch.object(bc_cli, "convert_cat", wraps=bc_cli.convert_cat) as convert_cat:
+            bc_cli.generate_bc_json(self.source, self.target, manifest=self.manifest)
+        self.assertEqual(1, convert_cat.call_count)
+
+        full_target = path.join(self.tmp_dir, "full.json")
+        bc_cli.generate_bc_json(self.source, full_target)
+        with open(self.target) as fh, open(full_target) as full_fh:
+            self.assertEqual(json.load(full_fh), json.load(fh))
+        self.assertEqual(1, len(Bc(self.target).find_description("^Changed description$")))
+
+    def test_jobs(self):
+        # parallel generation has the same output and collects talent errors from the workers
+        with open(self.source) as fh:
+            bc_source = json.load(fh)
+        family = [cat for cat in bc_source["cats"]["uber"] if "talents" in cat][-1]
+        family["talents"]["Unknown Talent"] = 1
+        with open(self.source, "w") as fh:
+            json.dump(bc_source, fh)
+
+        bc_cli.generate_bc_json(self.source, self.target)
+        parallel_target = path.join(self.tmp_dir, "parallel.json")
+        with self.assertLogs("bc", level="ERROR") as logs:
+            bc_cli.generate_bc_json(self.source, parallel_target, jobs=3)
+        self.assertTrue(any("No handler for talent 'Unknown Talent'" in line for line in logs.output))
+        with open(self.target) as fh, open(parallel_target) as parallel_fh:
+            self.assertEqual(json.load(fh), json.load(parallel_fh))
+
+    def test_jsonl(self):
+        jsonl_target = path.join(self.tmp_dir, "bc.jsonl")
+        bc_cli.generate_bc_json(self.source, self.target)
+        bc_cli.generate_bc_jsonl(self.source, jsonl_target)
+        with open(self.target) as fh, open(jsonl_target) as jsonl_fh:
+            self.assertListEqual(json.load(fh)["cats"], [json.loads(line) for line in jsonl_fh])
+
+        bc = Bc(jsonl_target)
+        self.assertListEqual([cat.name for cat in Bc(self.target).find_ability("wave")],
+                             [cat.name for cat in bc.find_ability("wave")])
+
+
+class TestBatch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bc = Bc("bc.json")
+
+    def test_batch(self):
+        queries = io.StringIO('{"rarity": "uber", "target": "red", "ability_effect": "wave"}\n'
+                              '\n'
+                              '{"cost": "not a cost"}\n'
+                              '{"name": "^Wall Cat$"}\n')
+        out = io.StringIO()
+        self.assertEqual(1, bc_cli.batch(self.bc, queries, out))
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(3, len(results))
+
+        cats = self.bc.find_ability_effect("wave", self.bc.find_target("red", self.bc.find_rarity("uber")))
+        self.assertEqual(len(cats), results[0]["count"])
+        self.assertListEqual([cat.name for cat in cats], [cat["name"] for cat in results[0]["cats"]])
+        self.assertEqual({"query": {"cost": "not a cost"}, "error": "Invalid cost: not a cost"}, results[1])
+        self.assertEqual(["Tank Cat", "Eraser Cat"], results[2]["cats"][0]["alias"])
+
+    def test_batch_unknown_key(self):
+        queries = io.StringIO('{"rarty": "uber"}\n'
+                              '["rarity", "uber"]\n'
+                              '{"rarity": "uber", "limit": 1}\n')
+        out = io.StringIO()
+        self.assertEqual(2, bc_cli.batch(self.bc, queries, out))
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertTrue(results[0]["error"].startswith("Unknown key(s) rarty, expected some of name, rarity"))
+        self.assertNotIn("count", results[0])
+        self.assertEqual('Invalid search: ["rarity", "uber"]', results[1]["error"])
+        self.assertEqual(1, results[2]["count"])
+
+
+class TestFormat(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bc = Bc("bc.json")
+
+    def run_search(self, **kwargs):
+        args = argparse.Namespace(ability=None, ability_effect=None, cost=None, description=None, effect=None,
+                                  fields=None, form=None, format=None, list=False, name=None, rarity=None,
+                                  stats=False, target=None)
+        vars(args).update(kwargs)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = bc_cli.search(self.bc, args)
+        return status, output.getvalue()
+
+    def test_format(self):
+        cats = self.bc.find_ability_effect("wave", self.bc.find_rarity("uber"))
+        status, output = self.run_search(rarity="uber", ability_effect="wave", format="json")
+        self.assertEqual(0, status)
+        records = json.loads(output)
+        self.assertListEqual([cat.name for cat in cats], [record["name"] for record in records])
+        for cat, record in zip(cats, records):
+            self.assertListEqual(cat.get_ability_effect("wave"), record["ability_effect"])
+        self.assertListEqual(bc_cli.DISPLAY_FIELDS + ["ability_effect"], list(records[0]))
+
+        status, output = self.run_search(rarity="uber", ability_effect="wave", format="jsonl")
+        self.assertListEqual(records, [json.loads(line) for line in output.splitlines()])
+
+        status, output = self.run_search(name="^Wall Cat$", format="csv", fields="name,alias,cost")
+        self.assertEqual('name,alias,cost\nWall Cat,"Tank Cat, Eraser Cat",150\n', output)
+        status, output = self.run_search(name="^Wall Cat$", format="tsv", fields="name,target")
+        self.assertEqual("name\ttarget\nWall Cat\t\n", output)
+        # costs per form are joined like the other lists
+        status, output = self.run_search(name="^Chill Cat$", format="csv", fields="name,cost")
+        self.assertEqual('name,cost\nChill Cat,"1050, 1020"\n', output)
+
+    def test_fields_invalid(self):
+        status, output = self.run_search(rarity="uber", format="json", fields="name,bogus")
+        self.assertEqual(1, status)
+        self.assertTrue(output.startswith("Unknown field(s) bogus"))
+
+    def test_text_matched(self):
+        # the matched values replace the per cat regexes without changing the text output
+        status, output = self.run_search(name="keiji", ability=".*", target="bl", effect="res", ability_effect="wave")
+        lines = output.splitlines()
+        self.assertEqual("2 cats found", lines[-1])
+        self.assertTrue(lines[1].endswith("a[Strengthen, Immune to Waves, Area Attack], t[Black], e[Resistant], "
+                                          "b[Immune to Waves]"))
+
+
+class TestMain(unittest.TestCase):
+    def test_main(self):
+        output = io.StringIO()
+        self.assertEqual(0, bc_cli.main(["-n", "^Wall Cat$", "-c", "150"], output))
+        self.assertEqual("Wall Cat (Tank Cat, Eraser Cat), Normal, 22% (2/9), c[150]\n1 cats found\n",
+                         output.getvalue())
+
+        # the catalog stays loaded
+        bc = bc_cli.loaded_bc(bc_cli.TARGET_FILE)
+        output = io.StringIO()
+        self.assertEqual(1, bc_cli.main(["-c", "cheap"], output))
+        self.assertEqual("Invalid cost: cheap\n", output.getvalue())
+        self.assertIs(bc, bc_cli.loaded_bc(bc_cli.TARGET_FILE))
+
+        output = io.StringIO()
+        self.assertEqual(0, bc_cli.main(["-h"], output))
+        self.assertIn("Battle Cats, search for cats by attributes.", output.getvalue())
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(2, bc_cli.main(["--bogus"], io.StringIO()))
+
+
+class TestServe(unittest.TestCase):
+    def test_forward(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            socket_file = path.join(tmp_dir, "bc.sock")
+            self.assertIsNone(bc_cli.forward(socket_file, []))
+
+            threading.Thread(target=bc_cli.serve, args=(socket_file,), daemon=True).start()
+            for _ in range(100):
+                if path.exists(socket_file):
+                    break
+                threading.Event().wait(0.05)
+
+            argv = ["-a", "wave", "-c", ">=1000", "-r", "uber"]
+            output = io.StringIO()
+            status = bc_cli.main(argv, output)
+            self.assertEqual((output.getvalue(), "", status), bc_cli.forward(socket_file, argv))
+
+            self.assertEqual(("Invalid cost: not a cost\n", "", 1), bc_cli.forward(socket_file, ["-c", "not a cost"]))
+            output, errors, status = bc_cli.forward(socket_file, ["--nosuch"])
+            self.assertEqual(2, status)
+            self.assertIn("unrecognized arguments: --nosuch", errors)
+            # batches, profiles and parallel searches run in the calling process
+            self.assertIsNone(bc_cli.forward(socket_file, ["--batch", "-"]))
+            self.assertIsNone(bc_cli.forward(socket_file, ["--profile", "-r", "uber"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+from os import path
+import subprocess
+import sys
+import unittest
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from bc import Bc
+from columnar import ColumnarTable
+from columnar import numpy
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestColumnar(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bc = Bc("bc.json")
+        cls.table = cls.bc.columnar()
+
+    def costs(self, cat):
+        return [cat.cost] if isinstance(cat.cost, int) else list(cat.cost)
+
+    def test_columns(self):
+        self.assertEqual(len(self.bc.cats), self.table.size)
+        for position in (0, 1, len(self.bc.cats) - 1):
+            cat = self.bc.cats[position]
+            start, end = self.table.cost_offsets[position], self.table.cost_offsets[position + 1]
+            self.assertListEqual(self.costs(cat), self.table.cost_values[start:end].tolist())
+            self.assertEqual(min(self.costs(cat)), self.table.min_cost[position])
+            self.assertEqual(cat.rarity_pct, self.table.rarity_pct[position])
+        self.assertIs(self.table, self.bc.columnar())
+
+    def test_masks(self):
+        mask = self.table.cost_range(1000, 3000) & self.table.rarity_is("uber")
+        cats = self.bc.find_cost("1000..3000", self.bc.find_rarity("^uber$"))
+        self.assertListEqual([self.bc.positions[cat] for cat in cats], self.table.positions(mask))
+        self.assertListEqual([position for position, cat in enumerate(self.bc.cats) if cat.rarity_index > 100],
+                             self.table.positions(self.table.compare("rarity_index", ">", 100)))
+        with self.assertRaises(ValueError):
+            self.table.compare("name", "<", 1)
+
+    def test_cost_stats(self):
+        cats = self.bc.find_ability("wave")
+        stats = self.bc.cost_stats(cats)
+        uber = [cost for cat in cats if cat.rarity == "Uber" for cost in self.costs(cat)]
+        self.assertEqual(len(uber), stats["Uber"]["count"])
+        self.assertEqual(min(uber), stats["Uber"]["min"])
+        self.assertEqual(max(uber), stats["Uber"]["max"])
+        self.assertAlmostEqual(sum(uber) / len(uber), stats["Uber"]["mean"])
+        self.assertEqual(len(uber), sum(count for low, high, count in stats["Uber"]["histogram"]))
+        self.assertEqual(len([cost for cost in uber if cost < 1000]), stats["Uber"]["histogram"][0][2])
+        self.assertEqual(set(cat.rarity for cat in cats), set(stats))
+        self.assertEqual(sum(len(self.costs(cat)) for cat in self.bc.cats),
+                         sum(rarity["count"] for rarity in self.bc.cost_stats().values()))
+
+    def test_empty(self):
+        table = ColumnarTable([])
+        self.assertDictEqual({}, table.cost_stats())
+        self.assertListEqual([], table.positions(table.cost_range(0, None)))
+
+
+
+class TestImport(unittest.TestCase):
+    def test_lazy_numpy(self):
+        # importing bc must not pay for numpy, only Bc.columnar imports it
+        code = "import sys; import bc; print('numpy' in sys.modules, 'columnar' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                cwd=path.dirname(path.dirname(path.abspath(__file__)))).stdout
+        self.assertEqual("False False\n", output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+from os import path
+import sys
+import unittest
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from bc import Bc
+from expression import Expression
+
+
+class TestExpression(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bc = Bc("bc.json")
+
+    def find(self, expression):
+        return [cat.name for cat in self.bc.find_expression(expression)]
+
+    def expected(self, predicate):
+        return [cat.name for cat in self.bc.cats if predicate(cat)]
+
+    def test_parse(self):
+        self.assertEqual(("or", [("clause", "ability", "wave"), ("and", [("clause", "effect", "freeze"),
+                                                                          ("not", ("clause", "form", "^True$"))])]),
+                         Expression("ability~wave or effect~freeze AND NOT form=True").tree)
+        self.assertEqual(("clause", "name", "^Wall\\ Cat$"), Expression('name="Wall Cat"').tree)
+        self.assertEqual(("not", ("clause", "cost", "75..150")), Expression("cost!=75..150").tree)
+        self.assertEqual(("clause", "cost", "<=3000"), Expression("(cost <= 3000)").tree)
+        for expression in ("", "ability~wave AND", "(rarity=uber", "rarity=uber)", "foo=1", "cost~1", "name<cat",
+                           "rarity=uber rarity=legend", "wave"):
+            with self.assertRaises(ValueError):
+                Expression(expression)
+
+    def test_evaluate(self):
+        self.assertListEqual(
+            self.expected(lambda cat: (cat.get_ability("wave") or cat.get_effect("freeze")) and cat.rarity == "Uber"
+                          and "Traitless" not in cat.target and self.bc.find_cost("<=3000", [cat])),
+            self.find("(ability~wave OR effect~freeze) AND rarity=uber AND NOT target=traitless AND cost<=3000"))
+        self.assertListEqual(self.expected(lambda cat: cat.name == "Wall Cat" or cat.get_description("Baseball")),
+                             self.find("name='wall cat' OR description~Baseball"))
+        self.assertListEqual(self.expected(lambda cat: cat.form != "Normal" and not cat.get_ability_effect("a")),
+                             self.find("NOT (form=normal OR ability_effect~a)"))
+        self.assertListEqual(self.expected(lambda cat: cat.rarity != "Uber" and cat.get_target("red")),
+                             self.find("rarity!=uber AND target~red"))
+
+    def test_search(self):
+        cats = self.bc.search(expression="ability~wave OR effect~freeze", rarity="uber")
+        self.assertListEqual(self.find("(ability~wave OR effect~freeze) AND rarity~uber"), [cat.name for cat in cats])
+
+
+if __name__ == '__main__':
+    unittest.main()
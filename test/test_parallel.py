@@ -0,0 +1,36 @@
+from os import path
+import re
+import sys
+import unittest
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from bc import Bc
+from parallel import ParallelExecutor
+from query import Query
+
+
+class TestParallel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bc = Bc("bc.json")
+
+    def test_run(self):
+        # min_parallel=0 sends every scan to the workers
+        with ParallelExecutor(self.bc, jobs=2, min_parallel=0) as executor:
+            for kwargs in ({"description": "wave.*attack"}, {"name": "cat", "description": "red", "rarity": "uber"},
+                           {"name": "^$"}, {"ability": "wave", "text": "immune"}, {"rarity": "legend", "cost": ">1"},
+                           {"expression": "ability~wave OR name~keiji", "description": "a"}, {"name": "é|ü"}, {}):
+                query = Query(**kwargs)
+                self.assertEqual(query.run(self.bc), executor.run(query), kwargs)
+
+    def test_search(self):
+        bc = Bc("bc.json")
+        expected = self.bc.search(name="cat", description="wave")
+        with ParallelExecutor(bc, jobs=2, min_parallel=0) as bc.executor:
+            self.assertListEqual([cat.name for cat in expected],
+                                 [cat.name for cat in bc.search(name="cat", description="wave")])
+            with self.assertRaises(re.error):
+                bc.search(name="(")
+
+
+if __name__ == '__main__':
+    unittest.main()
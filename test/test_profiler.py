@@ -0,0 +1,40 @@
+from os import path
+import json
+import sys
+import unittest
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from cat import compile_search
+from profiler import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stage(self):
+        profiler = Profiler()
+        for _ in range(3):
+            with profiler.stage("outer"):
+                with profiler.stage("inner"):
+                    pass
+        report = profiler.report()
+        self.assertListEqual(["inner", "outer"], list(report["stages"]))
+        self.assertEqual(3, report["stages"]["outer"]["calls"])
+        self.assertGreaterEqual(report["stages"]["outer"]["seconds"], report["stages"]["inner"]["seconds"])
+
+    def test_count(self):
+        profiler = Profiler()
+        profiler.count("regex_match")
+        profiler.count("regex_match", 4)
+        compile_search("profiler test (?:unique)")
+        counters = profiler.report()["counters"]
+        self.assertEqual(5, counters["regex_match"])
+        self.assertEqual(1, counters["regex_compile"])
+
+    def test_format(self):
+        profiler = Profiler()
+        with profiler.stage("load"):
+            pass
+        self.assertIn("load", profiler.format())
+        self.assertEqual(1, json.loads(profiler.format("json"))["stages"]["load"]["calls"])
+
+
+if __name__ == '__main__':
+    unittest.main()
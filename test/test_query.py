@@ -0,0 +1,38 @@
+from os import path
+import sys
+import unittest
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from bc import Bc
+from query import Query
+
+
+class TestQuery(unittest.TestCase):
+    test_file = "bc.json"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bc = Bc(cls.test_file)
+
+    def test_empty(self):
+        self.assertIsNone(Query(generate=False, list=False, name=None).run(self.bc))
+
+    def test_plan(self):
+        # indexed searches ordered by estimated count, scans last
+        query = Query(description="wave", name="cat", form="true", rarity="legend", cost="<=75")
+        plan = [field for field, search, estimate in query.plan(self.bc)]
+        self.assertListEqual(["rarity", "cost", "form", "name", "description"], plan)
+
+    def test_run(self):
+        # same cats as the fixed order chain
+        cats = self.bc.find_rarity("uber")
+        cats = self.bc.find_target("red", cats)
+        cats = self.bc.find_ability("wave", cats)
+        cats = self.bc.find_form("true", cats)
+        self.assertListEqual(cats, Query(rarity="uber", target="red", ability="wave", form="true").run(self.bc))
+
+    def test_run_empty_result(self):
+        self.assertListEqual([], Query(rarity="uber", cost=">99999", description="(").run(self.bc))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import json
+from os import path
+import sys
+import unittest
+from unittest import mock
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from bc import Bc
+from server import Server
+
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.bc = Bc("bc.json")
+
+    async def asyncSetUp(self):
+        self.server = await asyncio.start_server(Server(self.bc, max_expensive=2).handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def get(self, reader, writer, target):
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        headers = dict()
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if not line.strip():
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+    async def test_keep_alive(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        status, body = await self.get(reader, writer, "/find/rarity?q=legend")
+        self.assertEqual(200, status)
+        self.assertEqual(len(self.bc.find_rarity("legend")), body["count"])
+
+        status, body = await self.get(reader, writer, "/search?rarity=uber&target=red&description=wave")
+        cats = self.bc.find_description("wave", self.bc.find_target("red", self.bc.find_rarity("uber")))
+        self.assertListEqual([cat.name for cat in cats], [cat["name"] for cat in body["cats"]])
+
+        status, body = await self.get(reader, writer, "/search?ability=wave&effect=freeze&family=false")
+        self.assertEqual(len(self.bc.search(ability="wave", effect="freeze")), body["count"])
+        status, body = await self.get(reader, writer, "/search?ability=wave&effect=freeze&family=true")
+        self.assertEqual(len(self.bc.search(family=True, ability="wave", effect="freeze")), body["count"])
+
+        status, body = await self.get(reader, writer, "/stats")
+        self.assertEqual(self.bc.stats()["rarities"], body["rarities"])
+
+        status, body = await self.get(reader, writer, "/facets?rarity=uber&target=red")
+        cats = self.bc.find_target("red", self.bc.find_rarity("uber"))
+        self.assertEqual(len(cats), body["count"])
+        self.assertDictEqual(self.bc.facets(cats)["ability"], body["facets"]["ability"])
+
+        self.assertEqual(400, (await self.get(reader, writer, "/find/cost?q=cheap"))[0])
+        self.assertEqual(404, (await self.get(reader, writer, "/find/nothing?q=1"))[0])
+        writer.close()
+
+    async def test_bad_request(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        status, body = await self.get(reader, writer, "/search?self=1")
+        self.assertEqual(400, status)
+        self.assertTrue(body["error"].startswith("Unknown parameter(s) self"))
+        self.assertEqual(400, (await self.get(reader, writer, "/facets?rarty=uber"))[0])
+        self.assertEqual(400, (await self.get(reader, writer, "/search?rarity=uber&limit=x"))[0])
+        self.assertEqual(400, (await self.get(reader, writer, "/search?rarity=uber&family=maybe"))[0])
+        # the connection is still usable
+        self.assertEqual(200, (await self.get(reader, writer, "/search?rarity=uber&limit=1"))[0])
+        writer.close()
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(b"GARBAGE\r\n")
+        await writer.drain()
+        self.assertEqual(b"HTTP/1.1 400 Bad Request\r\n", await reader.readline())
+        writer.close()
+
+        # a request line over the stream limit
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(b"GET /search?name=" + b"a" * 100000 + b" HTTP/1.1\r\n\r\n")
+        await writer.drain()
+        self.assertEqual(b"HTTP/1.1 400 Bad Request\r\n", await reader.readline())
+        writer.close()
+
+    async def test_internal_error(self):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        with mock.patch.object(self.bc, "stats", side_effect=KeyError("boom")), self.assertLogs("bc", "ERROR"):
+            status, body = await self.get(reader, writer, "/stats")
+        self.assertEqual(500, status)
+        self.assertEqual("Internal error: KeyError", body["error"])
+        # the connection is kept alive
+        self.assertEqual(200, (await self.get(reader, writer, "/stats"))[0])
+        writer.close()
+
+    async def test_concurrent_cache(self):
+        # more distinct searches than the result cache holds, from several worker threads at once
+        server = await asyncio.start_server(Server(self.bc, max_expensive=8).handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        async def search(connection):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            statuses = [(await self.get(reader, writer, f"/search?name=cat{i}&rarity=uber"))[0]
+                        for i in range(connection, 320, 8)]
+            writer.close()
+            return statuses
+
+        try:
+            results = await asyncio.gather(*(search(connection) for connection in range(8)))
+        finally:
+            server.close()
+            await server.wait_closed()
+        self.assertEqual([200] * 320, [status for statuses in results for status in statuses])
+
+    def test_expensive(self):
+        self.assertTrue(Server.is_expensive("description", "wave"))
+        self.assertTrue(Server.is_expensive("text", "wave"))
+        self.assertTrue(Server.is_expensive("expression", "rarity=uber AND NOT description~wave"))
+        self.assertFalse(Server.is_expensive("expression", "rarity=uber AND ability~wave"))
+        self.assertFalse(Server.is_expensive("expression", "rarity=(uber"))
+        self.assertFalse(Server.is_expensive("rarity", "uber"))
+
+    async def test_concurrent(self):
+        async def search(name):
+            reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+            result = await self.get(reader, writer, f"/find/name?q={name}")
+            writer.close()
+            return result
+
+        names = ["cat", "keiji", "wall", "dragon", "^$", "cat"]
+        results = await asyncio.gather(*(search(name) for name in names))
+        for name, (status, body) in zip(names, results):
+            self.assertEqual(200, status)
+            self.assertEqual(len(self.bc.find_name(name)), body["count"])
+
+
+if __name__ == "__main__":
+    unittest.main()
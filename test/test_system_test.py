@@ -0,0 +1,40 @@
+import logging
+from os import path
+import sys
+import unittest
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+import system_test
+
+
+class TestSystemTest(unittest.TestCase):
+    def test_read_cases(self):
+        cases = dict(system_test.read_cases(system_test.CASES_FILE))
+        self.assertEqual("0 cats found", cases["-g"])
+        self.assertEqual("c\\[150\\]", cases["-c 150"])
+
+    def test_grep_pattern(self):
+        regex = system_test.grep_pattern("Keiji (Maeda Keiji), .*, c\\[3585\\]")
+        self.assertTrue(regex.search("Immortal Keiji (Maeda Keiji), Uber, 6% (12/173), c[3585]"))
+        self.assertFalse(regex.search("Immortal Keiji Maeda Keiji, Uber, c[3585]"))
+        self.assertTrue(system_test.grep_pattern("a\\|b").search("b"))
+
+    def test_run_case(self):
+        arguments, passed, seconds, output = system_test.run_case("-n ^Wall", "Wall Cat (Tank Cat, Eraser Cat)")
+        self.assertTrue(passed)
+        self.assertTrue(output.endswith("1 cats found\n"))
+        self.assertFalse(system_test.run_case("-c cheap", "cats found")[1])
+
+    def test_run_cases(self):
+        cases = [("-n ^Wall", "Wall Cat"), ("-c 150", "c\\[150\\]"), ("-c cheap", "cats found")]
+        results = system_test.run_cases(cases, jobs=2)
+        self.assertListEqual([True, True, False], [passed for arguments, passed, seconds, output in results])
+
+    def test_bc_cli(self):
+        # every module shares one bc_cli, the script and its log handler are loaded once
+        import benchmark
+        self.assertIs(system_test.bc_cli, benchmark.bc_cli)
+        self.assertEqual(1, len(logging.getLogger("bc").handlers))
+
+
+if __name__ == '__main__':
+    unittest.main()
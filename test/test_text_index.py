@@ -0,0 +1,33 @@
+from os import path
+import sys
+import unittest
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+from text_index import TextIndex
+
+
+class TestTextIndex(unittest.TestCase):
+    documents = [
+        "Immune to Wave attacks. Resistant to Red.",
+        "Freezes Floating enemies. Wave Attack.",
+        "A cat that freezes. Wave, wave, wave!",
+        ""
+    ]
+    index = TextIndex(documents)
+
+    def test_candidates(self):
+        self.assertSetEqual({0, 1, 2}, self.index.candidates("ave"))
+        self.assertSetEqual({0}, self.index.candidates("mune to wa"))
+        self.assertSetEqual(set(), self.index.candidates("mune to cats"))
+        self.assertIsNone(self.index.candidates("!"))
+
+    def test_search(self):
+        # every word must match, best tf-idf first
+        self.assertListEqual([2, 1], [position for position, score in self.index.search("wave freezes")])
+        self.assertListEqual([1], [position for position, score in self.index.search("freez* floating*")])
+        self.assertListEqual([], self.index.search("wave nothing"))
+        self.assertEqual(1, len(self.index.search("wave", limit=1)))
+        self.assertListEqual([], self.index.search(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
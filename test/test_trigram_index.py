@@ -0,0 +1,45 @@
+from os import path
+import sys
+import unittest
+from unittest import mock
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+import trigram_index
+from trigram_index import TrigramIndex
+
+
+class TestTrigramIndex(unittest.TestCase):
+    index = TrigramIndex({
+        "Maeda Keiji": [0],
+        "Wargod Keiji": [0, 1],
+        "Immortal Keiji": [0, 1, 2],
+        "Ken": [3],
+        "Wall Cat": [4]
+    })
+
+    def test_search(self):
+        self.assertSetEqual({"Maeda Keiji", "Wargod Keiji", "Immortal Keiji"},
+                            {name for name, distance, similarity in self.index.search("keji")})
+        name, distance, similarity = self.index.search("Wargod")[0]
+        self.assertEqual(("Wargod Keiji", 0), (name, distance))
+        self.assertEqual("Wall Cat", self.index.search("wal kat", max_distance=2)[0][0])
+        self.assertListEqual([], self.index.search("zzz"))
+        self.assertEqual(1, len(self.index.search("keiji", limit=1)))
+
+    def test_max_distance(self):
+        self.assertNotIn("Ken", [name for name, distance, similarity in self.index.search("keji")])
+        self.assertIn("Ken", [name for name, distance, similarity in self.index.search("keji", max_distance=2)])
+
+    def test_limit(self):
+        # a smaller limit truncates the same ranking and skips the distance of names that cannot make it
+        index = TrigramIndex({f"{prefix} Cat {i}": [i] for prefix in ("Evolved", "True") for i in range(200)})
+        for text in ("cat 42", "evolvd cat 19", "tru cat 7"):
+            ranking = index.search(text, limit=1000)
+            for limit in (1, 3, 10):
+                self.assertListEqual(ranking[:limit], index.search(text, limit=limit))
+        with mock.patch.object(trigram_index, "_levenshtein", wraps=trigram_index._levenshtein) as levenshtein:
+            index.search("evolved cat 42", limit=1)
+        self.assertLess(levenshtein.call_count, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+import math
+import re
+
+TOKEN = re.compile(r"\w+")
+
+
+class TextIndex:
+    def __init__(self, documents):
+        """
+        build posting lists of every case folded word of documents
+        :param list documents: document strings, a document is identified by its position
+        """
+        self.postings = dict()
+        self.lengths = list()
+        for position, document in enumerate(documents):
+            tokens = self.tokenize(document)
+            self.lengths.append(len(tokens))
+            for token in tokens:
+                posting = self.postings.setdefault(token, dict())
+                posting[position] = posting.get(position, 0) + 1
+
+    @staticmethod
+    def tokenize(text):
+        """
+        split text into case folded words
+        :param str text: text to split
+        :return: list of words
+        :rtype: list
+        """
+        return TOKEN.findall(text.lower())
+
+    def candidates(self, text):
+        """
+        find every document that may contain text as a case-insensitive substring. the first word of
+        text may end a longer word, the last word may start one, the words between must be exact.
+        :param str text: literal text, not a regex
+        :return: set of document positions, None if text has no words to look up
+        :rtype: set
+        """
+        tokens = self.tokenize(text)
+        if not tokens:
+            return None
+        if len(tokens) == 1:
+            words = [[word for word in self.postings if tokens[0] in word]]
+        else:
+            words = [[word for word in self.postings if word.endswith(tokens[0])]]
+            words.extend([token] for token in tokens[1:-1])
+            words.append([word for word in self.postings if word.startswith(tokens[-1])])
+        return self._intersect(words)
+
+    def search(self, text, limit=None):
+        """
+        rank documents containing every word of text by tf-idf. a word ending in * matches any word
+        with that prefix.
+        :param str text: words to search for, e.g. "wave immune", "freez*"
+        :param int limit: optional maximum number of results
+        :return: list of (position, score), best first
+        :rtype: list
+        """
+        terms = list()
+        for term in text.lower().split():
+            if term.endswith("*") and self.tokenize(term):
+                prefix = self.tokenize(term)[0]
+                terms.append([word for word in self.postings if word.startswith(prefix)])
+            else:
+                terms.extend([token] for token in self.tokenize(term))
+        positions = self._intersect(terms) if terms else set()
+
+        scores = dict.fromkeys(positions, 0.0)
+        for words in terms:
+            for word in words:
+                posting = self.postings.get(word, {})
+                idf = math.log(1 + len(self.lengths) / len(posting)) if posting else 0.0
+                for position in positions.intersection(posting):
+                    scores[position] += posting[position] / math.sqrt(self.lengths[position]) * idf
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked if limit is None else ranked[:limit]
+
+    def _intersect(self, words):
+        """
+        helper method that finds the documents containing at least one word of every list
+        :param list words: list of lists of alternative words
+        :return: set of document positions
+        :rtype: set
+        """
+        result = None
+        # rarest words first so the intersection shrinks quickly
+        words = sorted(words, key=lambda alternatives: sum(len(self.postings.get(word, ())) for word in alternatives))
+        for alternatives in words:
+            positions = set()
+            for word in alternatives:
+                positions.update(self.postings.get(word, ()))
+            result = positions if result is None else result & positions
+            if not result:
+                return set()
+        return result
@@ -0,0 +1,139 @@
+# created by: Dennis Kwong
+# cost: 2.00 cat food
+
+import heapq
+
+
+class TrigramIndex:
+    def __init__(self, names):
+        """
+        build the trigram posting lists of names
+        :param dict names: name -> positions of the cats known by that name
+        """
+        self.names = list(names)
+        self.positions = dict(names)
+        self.postings = dict()
+        for name_id, name in enumerate(self.names):
+            for trigram in self.trigrams(name):
+                self.postings.setdefault(trigram, list()).append(name_id)
+
+    @staticmethod
+    def trigrams(text):
+        """
+        return the trigrams of case folded text padded with spaces, so word starts and ends count
+        :param str text: text to split
+        :return: set of trigrams
+        :rtype: set
+        """
+        text = f" {' '.join(text.lower().split())} "
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def search(self, text, limit=10, max_distance=None, keep=None):
+        """
+        find names similar to text. a name matches if text is within max_distance edits of the whole
+        name or of any run of as many of its words as text has. only names sharing enough trigrams
+        with text are compared, those sharing the most first, and the search stops once no name
+        left can be among the best limit.
+        :param str text: name to look up, typos allowed
+        :param int limit: maximum number of names
+        :param int max_distance: maximum edit distance, by default 1 for up to 5 characters, else 2
+        :param function keep: optional filter, names it returns False for are skipped
+        :return: list of (name, edit distance, trigram similarity), best first
+        :rtype: list
+        """
+        text = " ".join(text.lower().split())
+        if max_distance is None:
+            max_distance = 1 if len(text) <= 5 else 2
+        trigrams = self.trigrams(text)
+        shared = dict()
+        for trigram in trigrams:
+            for name_id in self.postings.get(trigram, ()):
+                shared[name_id] = shared.get(name_id, 0) + 1
+
+        # one edit changes at most three trigrams, so a name sharing count trigrams is at least
+        # (len(trigrams) - count) / 3 edits away and its similarity is at most count / len(trigrams)
+        min_shared = max(1, len(trigrams) - 3 * max_distance)
+        candidates = sorted(((count, name_id) for name_id, count in shared.items() if count >= min_shared),
+                            reverse=True)
+        matches = list()
+        worst = None
+        previous = None
+        for count, name_id in candidates:
+            if count != previous and len(matches) >= limit:
+                # the worst of the best limit so far, names sharing fewer trigrams cannot beat it
+                worst_distance, worst_similarity, _ = heapq.nsmallest(limit, matches)[-1]
+                worst = (worst_distance, -worst_similarity)
+                lowest = -(-(len(trigrams) - count) // 3)
+                if lowest > worst[0] or (lowest == worst[0] and count / len(trigrams) < worst[1]):
+                    break
+            previous = count
+            name = self.names[name_id]
+            if keep and not keep(name):
+                continue
+            similarity = count / len(trigrams | self.trigrams(name))
+            cutoff = max_distance
+            if worst:
+                # a name less similar than the worst has to be closer to replace it
+                cutoff = worst[0] if similarity >= worst[1] else worst[0] - 1
+            if cutoff < 0:
+                continue
+            distance = self._distance(text, name.lower(), cutoff)
+            if distance <= cutoff:
+                matches.append((distance, -similarity, name))
+        return [(name, distance, -similarity) for distance, similarity, name in heapq.nsmallest(limit, matches)]
+
+    @staticmethod
+    def _distance(text, name, max_distance):
+        """
+        helper method that finds the smallest edit distance between text and the name or any run of
+        as many words of the name as text has
+        :param str text: case folded text
+        :param str name: case folded name
+        :param int max_distance: distances above this are not computed exactly
+        :return: edit distance, max_distance + 1 if it is larger
+        :rtype: int
+        """
+        words = name.split()
+        width = len(text.split())
+        runs = {name} | {" ".join(words[i:i + width]) for i in range(len(words) - width + 1)}
+        return min(_levenshtein(text, run, max_distance) for run in runs)
+
+
+def _levenshtein(a, b, max_distance):
+    """
+    edit distance between a and b. common prefixes and suffixes are skipped, only the band of
+    max_distance around the diagonal is computed and it stops early once the distance exceeds
+    max_distance
+    :param str a: first string
+    :param str b: second string
+    :param int max_distance: cutoff
+    :return: edit distance, max_distance + 1 if it is larger
+    :rtype: int
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # common prefixes and suffixes never add edits
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if not a or not b:
+        return min(max(len(a), len(b)), max_distance + 1)
+    too_far = max_distance + 1
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        char_a = a[i - 1]
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i if i <= max_distance else too_far
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != b[j - 1]), too_far)
+        if min(current[low - 1:high + 1]) > max_distance:
+            return too_far
+        previous = current
+    return previous[-1]